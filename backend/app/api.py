@@ -1,33 +1,72 @@
 import requests
-from typing import Optional, Any
-from config import BASIC_URL, API_URL, CURRENT_YEAR
+import http_cache
+from typing import Dict, Optional, Any, Tuple
+from config import BASIC_URL, API_URL, CURRENT_YEAR, SEJM_TERM
+from votes_calculator import get_sejm_voting_data
+from run_memo import memoized
 
 def fetch_json(url: str, error_prefix: str = "API") -> Optional[Any]:
     if not url:
         print(f"Error: URL is not set ({error_prefix})")
         return None
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError:
-        print(f"{error_prefix} error: {response.status_code}")
+        return http_cache.get_json(url)
+    except requests.exceptions.HTTPError as e:
+        print(f"{error_prefix} error: {e.response.status_code}")
     except requests.exceptions.RequestException as e:
         print(f"{error_prefix} connection error:", e)
     return None
 
+@memoized
 def fetch_one_law(eli: str) -> Optional[dict]:
     if not BASIC_URL:
         print("Error: BASIC_URL is not set in .env file")
         return None
     return fetch_json(f"{BASIC_URL}//{eli}", error_prefix="Law")
 
+@memoized
 def get_voting_data(url: str) -> Optional[dict]:
     return fetch_json(url, error_prefix="Voting")
 
-def fetch_api_data() -> Optional[list[dict]]:
+def fetch_api_data(year: Optional[int] = None) -> Optional[list[dict]]:
     if not API_URL:
         print("Error: API_URL is not set in .env file")
         return None
-    data = fetch_json(f"{API_URL}/{CURRENT_YEAR}", error_prefix="API")
+    data = fetch_json(f"{API_URL}/{year or CURRENT_YEAR}", error_prefix="API")
     return data.get("items", []) if isinstance(data, dict) else None
+
+
+def extract_last_vote_info(process_data: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    stages = process_data.get("stages", [])
+    last_vote = None
+
+    for stage in stages:
+        stage_entries = stage.get("children", []) if "children" in stage else [stage]
+
+        for entry in stage_entries:
+            if entry.get("stageName", "").lower() == "głosowanie":
+                last_vote = entry
+
+    if last_vote and "voting" in last_vote:
+        sitting = last_vote["voting"].get("sitting")
+        voting_number = last_vote["voting"].get("votingNumber")
+        return sitting, voting_number
+
+    return None, None
+
+def get_voting_details(act_details: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    voting_details = None
+    prints = act_details.get("prints", [])
+    
+    if prints and isinstance(prints, list):
+        process_api_link = prints[0].get("linkProcessAPI")
+        if process_api_link:
+            voting_data = get_voting_data(process_api_link)
+            if voting_data:
+                sitting, voting_number = extract_last_vote_info(voting_data)
+                if sitting and voting_number:
+                    # Acts of an earlier Sejm term were voted on in that term's sittings.
+                    term = voting_data.get("term") or SEJM_TERM
+                    voting_details = get_sejm_voting_data(term, sitting, voting_number)
+    
+    return voting_details
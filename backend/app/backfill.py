@@ -0,0 +1,99 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from pdf_utils import download_pdf, extract_texts_in_processes
+from storage import extracted_text_path, save_extracted_text
+from main import fetch_and_filter_acts, identify_new_acts, record_pipeline_results, export_run_metrics
+from pipeline import run_pipeline
+from processed_acts import get_processed_acts
+from database import reset_category_index
+from run_memo import run_scope
+import metrics
+from config import (
+    BASIC_URL,
+    CURRENT_YEAR,
+    BACKFILL_BATCH_SIZE,
+    BACKFILL_ACTS_PER_BATCH,
+    BACKFILL_BATCH_PAUSE,
+    BACKFILL_MAX_ACTS,
+    PIPELINE_FETCH_WORKERS,
+    configure_logging,
+)
+
+# Backfill runs the CPU-heavy PDF extraction for a whole year up front, on a
+# process pool, and stores the text per act. The pipeline then picks the
+# stored text up instead of downloading and parsing the PDF again.
+#
+# backfill_years processes every act of a range of years through the
+# pipeline. Progress is the per-year processed set (processed_acts.py), so an
+# interrupted backfill continues with the acts that are still missing.
+
+def _download_batch(elis: List[str]) -> Dict[str, bytes]:
+    with ThreadPoolExecutor(max_workers=PIPELINE_FETCH_WORKERS) as executor:
+        blobs = executor.map(lambda eli: download_pdf(f"{BASIC_URL}{eli}/text.pdf"), elis)
+        return {eli: data for eli, data in zip(elis, blobs) if data}
+
+def backfill_extract(year: int, max_workers: Optional[int] = None) -> int:
+    acts = fetch_and_filter_acts(year)
+    pending = [act["ELI"] for act in acts if not extracted_text_path(act["ELI"]).exists()]
+    print(f"🔔 Backfill {year}: {len(pending)} of {len(acts)} acts need text extraction")
+
+    extracted = 0
+    for start in range(0, len(pending), BACKFILL_BATCH_SIZE):
+        batch = pending[start:start + BACKFILL_BATCH_SIZE]
+        pdfs = _download_batch(batch)
+        texts = extract_texts_in_processes(pdfs, max_workers=max_workers)
+        for eli, text in texts.items():
+            if text:
+                save_extracted_text(eli, text)
+                extracted += 1
+        print(f"➡️ Extracted {extracted}/{len(pending)} acts")
+
+    return extracted
+
+def backfill_years(first_year: int, last_year: int, acts_per_batch: int = BACKFILL_ACTS_PER_BATCH, pause: float = BACKFILL_BATCH_PAUSE, max_acts: int = BACKFILL_MAX_ACTS) -> int:
+    processed_acts = get_processed_acts()
+    reset_category_index()
+
+    processed = 0
+    for year in range(first_year, last_year + 1):
+        items = fetch_and_filter_acts(year)
+        if not items:
+            continue
+
+        # Oldest first, as in the regular run.
+        pending = list(reversed(identify_new_acts(items, year)))
+        print(f"🔔 Backfill {year}: {len(pending)} of {len(items)} acts to process")
+
+        for start in range(0, len(pending), acts_per_batch):
+            if max_acts and processed >= max_acts:
+                print(f"⏸️ Stopping after {processed} acts, run again to continue")
+                return processed
+
+            batch = pending[start:start + acts_per_batch]
+            if max_acts:
+                batch = batch[:max_acts - processed]
+            results = run_pipeline(batch)
+            record_pipeline_results(year, results)
+            processed += len(batch)
+            print(f"➡️ {year}: {processed_acts.count(year)} acts processed")
+
+            if pause and start + acts_per_batch < len(pending):
+                time.sleep(pause)
+
+    return processed
+
+if __name__ == "__main__":
+    # python backfill.py 2024                 extract the texts of one year
+    # python backfill.py --years 2020 2024    process all acts of 2020-2024
+    configure_logging()
+    metrics.start_run()
+    if len(sys.argv) > 1 and sys.argv[1] == "--years":
+        first = int(sys.argv[2])
+        with run_scope():
+            backfill_years(first, int(sys.argv[3]) if len(sys.argv) > 3 else first)
+    else:
+        backfill_extract(int(sys.argv[1]) if len(sys.argv) > 1 else CURRENT_YEAR)
+    export_run_metrics()
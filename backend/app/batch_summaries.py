@@ -0,0 +1,461 @@
+import sys
+import json
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from local_store import open_sqlite
+from chunking import chunk_text
+from checkpoints import get_checkpoints, TEXT, CHUNK_SUMMARIES, ANALYSIS
+from llm_cache import get_llm_cache, LLMCache
+from openai_analyzer import get_openai_client, record_openai_cost, FRAGMENT_PROMPT, FRAGMENT_MAX_TOKENS
+from pdf_utils import download_pdf, extract_pdf_text
+from storage import load_extracted_text
+from main import fetch_and_filter_acts, identify_new_acts, export_run_metrics
+from pipeline import run_pipeline
+from processed_acts import get_processed_acts
+from database import reset_category_index
+from run_memo import run_scope
+import metrics
+from config import (
+    BASIC_URL,
+    OPENAI_MODEL,
+    LLM_CACHE_ENABLED,
+    BATCH_JOBS_FILE,
+    BATCH_DIR,
+    BATCH_COMPLETION_WINDOW,
+    BATCH_MAX_REQUESTS,
+    BATCH_MAX_FILE_BYTES,
+    BATCH_POLL_INTERVAL,
+    PIPELINE_FETCH_WORKERS,
+    configure_logging,
+)
+
+# Chunk summaries for many acts at once through the OpenAI Batch API, at half
+# the price of interactive calls, for backfills and re-summarization.
+#
+# submit writes one chat completion request per chunk (the same request
+# summarize_text makes) to JSONL job files and submits them. Chunks already
+# in the LLM cache are not sent. collect polls the open batches; once every
+# chunk of an act is answered, its summaries are checkpointed (CHUNK_SUMMARIES)
+# and the act goes through the regular pipeline, which resumes at the reduce
+# step. Answers also go into the LLM cache, so an act with failed requests
+# only repeats those chunks interactively. State lives in BATCH_JOBS_FILE, so
+# collect can run any time later, from another process.
+#
+# An act is stored together with a row for every chunk in one transaction,
+# and a row is tied to its batch only once the job file is accepted. Acts
+# with rows that were never sent (a failed upload or an interrupted submit)
+# are dropped, so the next submit starts them over instead of collect
+# checkpointing a partial list of summaries.
+#
+#   python batch_summaries.py submit 2020 2024
+#   python batch_summaries.py collect [--wait]
+
+PENDING = "pending"
+READY = "ready"
+FINISHED_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+class BatchStore:
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY,
+                job_file TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS batch_acts (
+                eli TEXT PRIMARY KEY,
+                year INTEGER NOT NULL,
+                act TEXT NOT NULL,
+                state TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                chunks INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS batch_requests (
+                custom_id TEXT PRIMARY KEY,
+                eli TEXT NOT NULL,
+                chunk INTEGER NOT NULL,
+                batch_id TEXT,
+                cache_key TEXT NOT NULL,
+                summary TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS batch_requests_eli ON batch_requests (eli);
+            CREATE INDEX IF NOT EXISTS batch_requests_batch ON batch_requests (batch_id);
+        """)
+
+    def __contains__(self, eli: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM batch_acts WHERE eli = ?", (eli,)).fetchone() is not None
+
+    def add_act(self, eli: str, year: int, act: Dict[str, Any], state: str = PENDING) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batch_acts (eli, year, act, state, created_at) VALUES (?, ?, ?, ?, ?)",
+                (eli, year, json.dumps(act, ensure_ascii=False), state, time.time())
+            )
+
+    # The act and a row for each of its chunks, all or nothing. Rows of cached
+    # chunks come with their summary, the others wait for add_batch.
+    def add_act_requests(self, eli: str, year: int, act: Dict[str, Any], rows: List[Tuple[str, str, int, str, Optional[str]]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM batch_requests WHERE eli = ?", (eli,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO batch_acts (eli, year, act, state, created_at, chunks) VALUES (?, ?, ?, ?, ?, ?)",
+                    (eli, year, json.dumps(act, ensure_ascii=False), PENDING, time.time(), len(rows))
+                )
+                self._conn.executemany(
+                    "INSERT INTO batch_requests (custom_id, eli, chunk, cache_key, summary) VALUES (?, ?, ?, ?, ?)", rows
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def add_batch(self, batch_id: str, job_file: Path, custom_ids: List[str], status: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO batches (batch_id, job_file, requests, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (batch_id, str(job_file), len(custom_ids), status, now, now)
+                )
+                self._conn.executemany(
+                    "UPDATE batch_requests SET batch_id = ? WHERE custom_id = ?", [(batch_id, custom_id) for custom_id in custom_ids]
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # Acts with requests that are in no batch and were not answered from the cache.
+    def remove_unsent_acts(self) -> int:
+        with self._lock:
+            elis = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT eli FROM batch_requests WHERE batch_id IS NULL AND summary IS NULL AND error IS NULL"
+            ).fetchall()]
+            for eli in elis:
+                self._conn.execute("DELETE FROM batch_requests WHERE eli = ?", (eli,))
+                self._conn.execute("DELETE FROM batch_acts WHERE eli = ?", (eli,))
+        return len(elis)
+
+    def set_batch_status(self, batch_id: str, status: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE batches SET status = ?, updated_at = ? WHERE batch_id = ?", (status, time.time(), batch_id))
+
+    def open_batches(self) -> List[str]:
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT batch_id FROM batches WHERE status NOT IN ({placeholders}) ORDER BY created_at", FINISHED_STATUSES
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def answer(self, custom_id: str, summary: Optional[str] = None, error: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT cache_key FROM batch_requests WHERE custom_id = ?", (custom_id,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE batch_requests SET summary = ?, error = ? WHERE custom_id = ?", (summary, error, custom_id))
+        return row[0]
+
+    # Requests a finished batch returned nothing for (expired or cancelled batches).
+    def close_unanswered(self, batch_id: str, error: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE batch_requests SET error = ? WHERE batch_id = ? AND summary IS NULL AND error IS NULL", (error, batch_id)
+            ).rowcount
+
+    # Pending acts with a request for every chunk and every request answered;
+    # summaries is None when any request failed.
+    def answered_acts(self) -> List[Tuple[str, Optional[List[str]]]]:
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT a.eli, r.summary, r.error FROM batch_acts a
+                JOIN batch_requests r ON r.eli = a.eli
+                WHERE a.state = ? AND NOT EXISTS (
+                    SELECT 1 FROM batch_requests u WHERE u.eli = a.eli AND u.summary IS NULL AND u.error IS NULL
+                ) AND a.chunks = (
+                    SELECT COUNT(*) FROM batch_requests c WHERE c.eli = a.eli
+                )
+                ORDER BY a.eli, r.chunk
+            """, (PENDING,)).fetchall()
+        acts: Dict[str, Optional[List[str]]] = {}
+        for eli, summary, error in rows:
+            summaries = acts.setdefault(eli, [])
+            if summaries is None or summary is None:
+                acts[eli] = None
+            else:
+                summaries.append(summary)
+        return list(acts.items())
+
+    def set_act_state(self, eli: str, state: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE batch_acts SET state = ? WHERE eli = ?", (state, eli))
+
+    def ready_acts(self) -> List[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT year, act FROM batch_acts WHERE state = ? ORDER BY created_at", (READY,)).fetchall()
+        return [(year, json.loads(act)) for year, act in rows]
+
+    def remove_act(self, eli: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM batch_requests WHERE eli = ?", (eli,))
+            self._conn.execute("DELETE FROM batch_acts WHERE eli = ?", (eli,))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            acts = dict(self._conn.execute("SELECT state, COUNT(*) FROM batch_acts GROUP BY state").fetchall())
+        return {PENDING: acts.get(PENDING, 0), READY: acts.get(READY, 0), "openBatches": len(self.open_batches())}
+
+_store: Optional[BatchStore] = None
+_store_lock = threading.Lock()
+
+def get_batch_store() -> BatchStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BatchStore(BATCH_JOBS_FILE)
+        return _store
+
+def fragment_request(custom_id: str, chunk: str) -> Dict[str, Any]:
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": FRAGMENT_PROMPT},
+                {"role": "user", "content": chunk}
+            ],
+            "max_tokens": FRAGMENT_MAX_TOKENS
+        }
+    }
+
+def load_act_text(eli: str) -> Optional[str]:
+    text = get_checkpoints().load(eli).get(TEXT) or load_extracted_text(eli)
+    if not text:
+        pdf = download_pdf(f"{BASIC_URL}{eli}/text.pdf")
+        text = extract_pdf_text(pdf) if pdf else None
+    # The pipeline picks the text up from the checkpoint instead of downloading the PDF again.
+    if text:
+        get_checkpoints().save(eli, TEXT, text)
+    return text
+
+# Splits the requests into job files within the Batch API limits; returns each file with its custom_ids.
+def write_job_files(requests: List[Dict[str, Any]]) -> List[Tuple[Path, List[str]]]:
+    BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    files: List[Tuple[Path, List[str]]] = []
+    lines: List[str] = []
+    custom_ids: List[str] = []
+    size = 0
+
+    def _flush() -> None:
+        path = BATCH_DIR / f"summaries-{stamp}-{len(files) + 1}.jsonl"
+        path.write_text("".join(lines), encoding="utf-8")
+        files.append((path, custom_ids))
+
+    for request in requests:
+        line = json.dumps(request, ensure_ascii=False) + "\n"
+        line_size = len(line.encode("utf-8"))
+        if lines and (len(lines) >= BATCH_MAX_REQUESTS or size + line_size > BATCH_MAX_FILE_BYTES):
+            _flush()
+            lines, custom_ids, size = [], [], 0
+        lines.append(line)
+        custom_ids.append(request["custom_id"])
+        size += line_size
+    if lines:
+        _flush()
+    return files
+
+def submit_job_file(path: Path) -> Tuple[str, str]:
+    with get_openai_client() as client:
+        with open(path, "rb") as f:
+            uploaded = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"job_file": path.name}
+        )
+    return batch.id, batch.status
+
+def submit_acts(acts: List[Dict[str, Any]], year: int) -> int:
+    store = get_batch_store()
+    checkpoints = get_checkpoints()
+    cache = get_llm_cache() if LLM_CACHE_ENABLED else None
+    store.remove_unsent_acts()
+    acts = [act for act in acts if act["ELI"] not in store]
+
+    with ThreadPoolExecutor(max_workers=PIPELINE_FETCH_WORKERS) as executor:
+        texts = list(executor.map(lambda act: load_act_text(act["ELI"]), acts))
+
+    requests: List[Dict[str, Any]] = []
+    for act, text in zip(acts, texts):
+        eli = act["ELI"]
+        saved = checkpoints.load(eli)
+        if saved.get(CHUNK_SUMMARIES) or saved.get(ANALYSIS):
+            store.add_act(eli, year, act, READY)
+            continue
+        if not text:
+            print(f"❌ Failed to fetch PDF text for act: {act.get('title')}")
+            continue
+
+        chunks, _ = chunk_text(text)
+        if not chunks:
+            print(f"❌ No text to summarize for act: {act.get('title')}")
+            continue
+
+        rows = []
+        for i, chunk in enumerate(chunks):
+            custom_id = f"{eli}#{i}"
+            cache_key = LLMCache.make_key(OPENAI_MODEL, FRAGMENT_PROMPT, chunk, FRAGMENT_MAX_TOKENS)
+            cached = cache.get(cache_key) if cache else None
+            rows.append((custom_id, eli, i, cache_key, cached))
+            if cached is None:
+                requests.append(fragment_request(custom_id, chunk))
+        store.add_act_requests(eli, year, act, rows)
+
+    submitted = 0
+    try:
+        for path, custom_ids in write_job_files(requests):
+            batch_id, status = submit_job_file(path)
+            store.add_batch(batch_id, path, custom_ids, status)
+            submitted += len(custom_ids)
+            print(f"📤 Submitted {path.name}: {len(custom_ids)} requests as batch {batch_id}")
+    finally:
+        metrics.inc("openai_batch_requests_total", submitted, result="submitted")
+        removed = store.remove_unsent_acts()
+        if removed:
+            print(f"❌ {removed} acts were not submitted, the next submit starts them over")
+    return submitted
+
+def submit_years(first_year: int, last_year: int) -> int:
+    store = get_batch_store()
+    submitted = 0
+    for year in range(first_year, last_year + 1):
+        items = fetch_and_filter_acts(year)
+        if not items:
+            continue
+        pending = [act for act in reversed(identify_new_acts(items, year)) if act["ELI"] not in store]
+        print(f"🔔 Batch {year}: {len(pending)} of {len(items)} acts to summarize")
+        submitted += submit_acts(pending, year)
+    return submitted
+
+def apply_results(content: str) -> None:
+    store = get_batch_store()
+    cache = get_llm_cache() if LLM_CACHE_ENABLED else None
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        if response.get("status_code") == 200 and body.get("choices"):
+            summary = body["choices"][0]["message"]["content"]
+            cache_key = store.answer(record["custom_id"], summary=summary)
+            if cache and cache_key:
+                cache.set(cache_key, summary)
+            usage = body.get("usage") or {}
+            metrics.inc("openai_batch_tokens_total", usage.get("prompt_tokens", 0), model=OPENAI_MODEL, direction="in")
+            metrics.inc("openai_batch_tokens_total", usage.get("completion_tokens", 0), model=OPENAI_MODEL, direction="out")
+            record_openai_cost(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), batch=True)
+            metrics.inc("openai_batch_requests_total", result="ok")
+        else:
+            error = record.get("error") or body.get("error") or f"HTTP {response.get('status_code')}"
+            store.answer(record["custom_id"], error=json.dumps(error, ensure_ascii=False))
+            metrics.inc("openai_batch_requests_total", result="failed")
+
+def poll_batches() -> int:
+    store = get_batch_store()
+    open_batches = store.open_batches()
+    if not open_batches:
+        return 0
+
+    with get_openai_client() as client:
+        for batch_id in open_batches:
+            batch = client.batches.retrieve(batch_id)
+            if batch.status in FINISHED_STATUSES:
+                for file_id in (batch.output_file_id, batch.error_file_id):
+                    if file_id:
+                        apply_results(client.files.content(file_id).text)
+                unanswered = store.close_unanswered(batch_id, f"Batch {batch.status}")
+                print(f"📥 Batch {batch_id} {batch.status}" + (f", {unanswered} requests without a result" if unanswered else ""))
+            store.set_batch_status(batch_id, batch.status)
+
+    ready = 0
+    for eli, summaries in store.answered_acts():
+        # With a failed chunk the pipeline summarizes the act again; the
+        # answered chunks come from the LLM cache.
+        if summaries is not None:
+            get_checkpoints().save(eli, CHUNK_SUMMARIES, summaries)
+        store.set_act_state(eli, READY)
+        ready += 1
+    return ready
+
+def process_ready_acts() -> int:
+    store = get_batch_store()
+    processed_acts = get_processed_acts()
+
+    by_year: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for year, act in store.ready_acts():
+        # Processed by a regular run in the meantime.
+        if act["ELI"] in processed_acts.elis(year):
+            store.remove_act(act["ELI"])
+            continue
+        by_year[year].append(act)
+    if not by_year:
+        return 0
+
+    reset_category_index()
+    processed = 0
+    for year, acts in sorted(by_year.items()):
+        # Summaries are checkpointed, the pipeline only makes the final analysis call.
+        results = run_pipeline(acts)
+        saved = [act["ELI"] for act, success in results if success]
+        processed_acts.mark(year, saved)
+        for eli in saved:
+            store.remove_act(eli)
+        processed += len(saved)
+    return processed
+
+def collect(wait: bool = False, poll_interval: float = BATCH_POLL_INTERVAL) -> int:
+    store = get_batch_store()
+    processed = 0
+    while True:
+        poll_batches()
+        processed += process_ready_acts()
+        counts = store.counts()
+        print(f"Batches: {counts['openBatches']} open, {counts[PENDING]} acts waiting, {processed} acts processed")
+        if not wait or not counts["openBatches"]:
+            return processed
+        time.sleep(poll_interval)
+
+if __name__ == "__main__":
+    configure_logging()
+    metrics.start_run()
+    if len(sys.argv) > 2 and sys.argv[1] == "submit":
+        first = int(sys.argv[2])
+        with run_scope():
+            submit_years(first, int(sys.argv[3]) if len(sys.argv) > 3 else first)
+    elif len(sys.argv) > 1 and sys.argv[1] == "collect":
+        with run_scope():
+            collect(wait="--wait" in sys.argv[2:])
+    else:
+        print("Usage: python batch_summaries.py submit FIRST_YEAR [LAST_YEAR] | collect [--wait]")
+        sys.exit(1)
+    export_run_metrics()
@@ -0,0 +1,64 @@
+import json
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+def parse_keywords(value: Any) -> List[str]:
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except json.JSONDecodeError:
+            return [value]
+        return parsed if isinstance(parsed, list) else [value]
+    if isinstance(value, list):
+        return value
+    return []
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(str(keyword).split()).casefold()
+
+# Inverted index keyword -> categories, built from the category table once
+# per run. Lookups rank categories by how many of the act's keywords they
+# share, with no database round trip.
+class CategoryIndex:
+    def __init__(self, categories: Iterable[Dict[str, Any]] = ()):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._keywords: Dict[str, List[str]] = {}
+        self._categories_by_keyword: Dict[str, Set[str]] = {}
+        for category_data in categories:
+            self.set_category(category_data.get("category"), parse_keywords(category_data.get("keywords", [])))
+
+    def set_category(self, category_name: str, keywords: List[str]) -> None:
+        if not category_name:
+            return
+        with self._lock:
+            for keyword in self._keywords.get(category_name, []):
+                names = self._categories_by_keyword.get(normalize_keyword(keyword))
+                if names:
+                    names.discard(category_name)
+            self._keywords[category_name] = list(keywords)
+            for keyword in keywords:
+                self._categories_by_keyword.setdefault(normalize_keyword(keyword), set()).add(category_name)
+            self.version += 1
+
+    def rank(self, keywords: List[str]) -> List[Tuple[str, int]]:
+        counts: Counter = Counter()
+        with self._lock:
+            for keyword in {normalize_keyword(keyword) for keyword in keywords}:
+                counts.update(self._categories_by_keyword.get(keyword, ()))
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def best_match(self, keywords: List[str]) -> Optional[str]:
+        ranked = self.rank(keywords)
+        return ranked[0][0] if ranked else None
+
+    def categories(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"category": name, "keywords": list(keywords)}
+                for name, keywords in sorted(self._keywords.items())
+            ]
+
+    def __len__(self) -> int:
+        return len(self._keywords)
@@ -0,0 +1,65 @@
+import re
+import zlib
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from category_index import normalize_keyword
+from config import CATEGORY_VECTOR_DIM
+
+# Local similarity stage between the exact keyword index and the AI fallback.
+# Categories (name + keywords) and acts (keywords, title, summary) are turned
+# into TF-IDF vectors over hashed character trigrams, which tolerates Polish
+# inflection ("podatek" / "podatku") without a stemmer.
+
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+def _trigrams(text: str) -> List[str]:
+    grams = []
+    for word in normalize_keyword(HTML_TAG_RE.sub(" ", text)).split():
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _term_counts(text: str, dim: int) -> np.ndarray:
+    # crc32 instead of hash() so vectors are stable across processes.
+    buckets = [zlib.crc32(gram.encode("utf-8")) % dim for gram in _trigrams(text)]
+    return np.bincount(np.asarray(buckets, dtype=np.int64), minlength=dim).astype(np.float32)
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class CategoryMatcher:
+    def __init__(self, categories: List[Dict[str, Any]], dim: int = CATEGORY_VECTOR_DIM):
+        self.dim = dim
+        self.categories = categories
+        self.names = [category_data["category"] for category_data in categories]
+
+        if not categories:
+            self.idf = np.ones(dim, dtype=np.float32)
+            self.vectors = np.zeros((0, dim), dtype=np.float32)
+            return
+
+        documents = [
+            " ".join([category_data["category"]] + [str(keyword) for keyword in category_data.get("keywords", [])])
+            for category_data in categories
+        ]
+        counts = np.vstack([_term_counts(document, dim) for document in documents])
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.vectors = _normalize_rows(np.log1p(counts) * self.idf)
+
+    def rank(self, keywords: List[str], title: str = "", content: str = "") -> List[Tuple[str, float]]:
+        if not self.names:
+            return []
+        query = " ".join([str(keyword) for keyword in keywords] + [title, content[:2000]])
+        vector = _normalize_rows(np.log1p(_term_counts(query, self.dim)) * self.idf)
+        scores = self.vectors @ vector
+        order = np.argsort(-scores, kind="stable")
+        return [(self.names[i], float(scores[i])) for i in order]
+
+    def top_categories(self, ranked: List[Tuple[str, float]], limit: int) -> List[Dict[str, Any]]:
+        by_name = {category_data["category"]: category_data for category_data in self.categories}
+        return [by_name[name] for name, _ in ranked[:limit]]
@@ -0,0 +1,59 @@
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from local_store import open_sqlite
+from config import CHECKPOINTS_FILE
+
+# Per-act results of finished pipeline stages, keyed by ELI. When an act
+# fails late (e.g. on the insert), the next attempt resumes from the last
+# completed stage instead of repeating PDF extraction and every LLM call.
+# Checkpoints are cleared once the act is saved.
+
+TEXT = "text"
+DETAILS = "details"
+VOTES = "votes"
+CHUNK_SUMMARIES = "chunk_summaries"
+ANALYSIS = "analysis"
+
+class CheckpointStore:
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                eli TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (eli, stage)
+            )
+        """)
+
+    def load(self, eli: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT stage, data FROM checkpoints WHERE eli = ?", (eli,)).fetchall()
+        return {stage: json.loads(data) for stage, data in rows}
+
+    def save(self, eli: str, stage: str, data: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (eli, stage, data, updated_at) VALUES (?, ?, ?, ?)",
+                (eli, stage, json.dumps(data, ensure_ascii=False), time.time())
+            )
+
+    def clear(self, eli: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE eli = ?", (eli,))
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+def get_checkpoints() -> CheckpointStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore(CHECKPOINTS_FILE)
+        return _store
@@ -0,0 +1,181 @@
+import re
+import math
+from collections import Counter
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from rate_limiter import estimate_tokens
+from config import CHUNK_TARGET_TOKENS, PDF_PAGE_BREAK
+
+# Token-budget chunking for summarization. Instead of fixed 3000 character
+# windows with a 200 character overlap, the text is cut at article and
+# paragraph boundaries ("Art. 5.", "§ 2.") and whole units are packed into
+# chunks of up to CHUNK_TARGET_TOKENS, with no overlap. Running headers and
+# footers that PyMuPDF repeats on every page are dropped first.
+#
+# Pages are consumed as they come (iter_chunks): headers and footers are
+# learned from the first BOILERPLATE_WINDOW pages, and a chunk is yielded as
+# soon as it is full, so a long document is summarized while it is still
+# being parsed and never held in memory as one string here.
+
+UNIT_START_RE = re.compile(r"^(?=(?:Art\.|§)\s*\d)", re.MULTILINE)
+DIGITS_RE = re.compile(r"\d+")
+LETTER_RE = re.compile(r"[^\W\d_]")
+# Article, paragraph, section and point references, in any case.
+REFERENCE_RE = re.compile(r"(?:art\.|§|ust\.|pkt)\s*\d", re.IGNORECASE)
+
+# Lines checked for headers/footers at the top and bottom of each page, and
+# the share of pages a line has to appear on to count as one.
+EDGE_LINES = 2
+BOILERPLATE_MIN_SHARE = 0.5
+BOILERPLATE_WINDOW = 10
+
+# What the old splitter sent: 3000 character windows overlapping by 200.
+BASELINE_CHUNK_SIZE = 3000
+BASELINE_CHUNK_OVERLAP = 200
+
+def _line_key(line: str) -> Optional[str]:
+    # Page numbers differ from page to page, the rest of a header does not.
+    # Lines without letters ("2)", a bare page number) and lines starting
+    # with a reference ("Art. 5.", "art. 5a.", "§ 3.") often sit at a page
+    # edge too, but are text.
+    line = " ".join(line.split())
+    if not LETTER_RE.search(line) or REFERENCE_RE.match(line):
+        return None
+    return DIGITS_RE.sub("#", line).casefold()
+
+def _edge_keys(lines: List[str]) -> Dict[int, str]:
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    indexes = set(content[:EDGE_LINES] + content[-EDGE_LINES:])
+    keys = {i: _line_key(lines[i]) for i in indexes}
+    return {i: key for i, key in keys.items() if key is not None}
+
+def _repeated_edge_lines(pages: List[str]) -> Set[str]:
+    if len(pages) < 2:
+        return set()
+    counts: Counter = Counter()
+    for page in pages:
+        lines = page.split("\n")
+        counts.update(set(_edge_keys(lines).values()))
+    min_pages = max(2, math.ceil(BOILERPLATE_MIN_SHARE * len(pages)))
+    return {key for key, count in counts.items() if count >= min_pages}
+
+def _drop_edge_lines(page: str, repeated: Set[str]) -> Tuple[str, int]:
+    if not repeated:
+        return page, 0
+    lines = page.split("\n")
+    drop = {i for i, key in _edge_keys(lines).items() if key in repeated}
+    removed = sum(len(lines[i]) + 1 for i in drop)
+    return "\n".join(line for i, line in enumerate(lines) if i not in drop), removed
+
+# Headers and footers are learned from the first `window` pages only and then
+# dropped from every page, so only the window is ever buffered.
+def iter_clean_pages(pages: Iterable[str], counters: Dict[str, int], window: int = BOILERPLATE_WINDOW) -> Iterator[str]:
+    iterator = iter(pages)
+    head = list(islice(iterator, window))
+    repeated = _repeated_edge_lines(head)
+    for page in chain(head, iterator):
+        counters["chars"] = counters.get("chars", 0) + len(page)
+        text, removed = _drop_edge_lines(page, repeated)
+        counters["boilerplateChars"] = counters.get("boilerplateChars", 0) + removed
+        yield text
+
+def _split_oversized(unit: str, target_tokens: int) -> List[str]:
+    pieces = []
+    for line in unit.splitlines(keepends=True):
+        while estimate_tokens(line) > target_tokens:
+            cut = target_tokens * 4
+            pieces.append(line[:cut])
+            line = line[cut:]
+        pieces.append(line)
+    return pieces
+
+def _fit_unit(unit: str, target_tokens: int) -> List[str]:
+    if not unit.strip():
+        return []
+    if estimate_tokens(unit) > target_tokens:
+        return _split_oversized(unit, target_tokens)
+    return [unit]
+
+# Units of cleaned pages, as pages arrive. The text after the last unit start
+# seen may continue on the next page, so it is carried over. Once it is over
+# the token target, it is cut at line boundaries like any oversized unit and
+# only its last line is carried.
+def iter_units(pages: Iterable[str], target_tokens: int) -> Iterator[str]:
+    tail: Optional[str] = None
+    oversized = False
+    for page in pages:
+        page = page.strip("\n")
+        tail = page if tail is None else f"{tail}\n{page}"
+        units = UNIT_START_RE.split(tail)
+        tail = units.pop()
+        if units:
+            first = units.pop(0)
+            yield from _split_oversized(first, target_tokens) if oversized else _fit_unit(first, target_tokens)
+            for unit in units:
+                yield from _fit_unit(unit, target_tokens)
+            oversized = False
+        if oversized or estimate_tokens(tail) > target_tokens:
+            pieces = _split_oversized(tail, target_tokens)
+            tail = pieces.pop() if pieces else ""
+            oversized = True
+            yield from pieces
+    if tail is not None:
+        yield from _split_oversized(tail, target_tokens) if oversized else _fit_unit(tail, target_tokens)
+
+def iter_packed(units: Iterable[str], target_tokens: int) -> Iterator[str]:
+    current: List[str] = []
+    current_tokens = 0
+    for unit in units:
+        tokens = estimate_tokens(unit)
+        if current and current_tokens + tokens > target_tokens:
+            yield "".join(current).strip()
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current and "".join(current).strip():
+        yield "".join(current).strip()
+
+def baseline_chunk_count(length: int) -> int:
+    if length <= BASELINE_CHUNK_SIZE:
+        return 1 if length else 0
+    return math.ceil((length - BASELINE_CHUNK_OVERLAP) / (BASELINE_CHUNK_SIZE - BASELINE_CHUNK_OVERLAP))
+
+# Chunks of a text (pages separated by PDF_PAGE_BREAK) or of an iterable of
+# pages, yielded as they are complete. counters collects what chunk_stats
+# needs: characters read, header/footer characters dropped, chunks and their
+# tokens.
+def iter_chunks(text: Union[str, Iterable[str]], target_tokens: int = CHUNK_TARGET_TOKENS, counters: Optional[Dict[str, int]] = None) -> Iterator[str]:
+    counters = {} if counters is None else counters
+    pages = text.split(PDF_PAGE_BREAK) if isinstance(text, str) else text
+    for chunk in iter_packed(iter_units(iter_clean_pages(pages, counters), target_tokens), target_tokens):
+        counters["chunks"] = counters.get("chunks", 0) + 1
+        counters["chunkTokens"] = counters.get("chunkTokens", 0) + estimate_tokens(chunk)
+        yield chunk
+
+# How the chunks compare with the old character splitter. request_tokens is
+# the per-request overhead (the prompt) that every extra chunk pays again.
+def chunk_stats(counters: Dict[str, int], request_tokens: int = 0) -> Dict[str, Any]:
+    chars = counters.get("chars", 0)
+    chunks = counters.get("chunks", 0)
+    baseline_chunks = baseline_chunk_count(chars)
+    baseline_tokens = (
+        chars // 4 + 1
+        + max(baseline_chunks - 1, 0) * (BASELINE_CHUNK_OVERLAP // 4)
+        + baseline_chunks * request_tokens
+    )
+    tokens = counters.get("chunkTokens", 0) + chunks * request_tokens
+    return {
+        "chunks": chunks,
+        "tokens": tokens,
+        "boilerplateTokens": counters.get("boilerplateChars", 0) // 4,
+        "baselineChunks": baseline_chunks,
+        "baselineTokens": baseline_tokens,
+        "savedTokens": baseline_tokens - tokens,
+        "savedRequests": baseline_chunks - chunks,
+    }
+
+def chunk_text(text: Union[str, Iterable[str]], target_tokens: int = CHUNK_TARGET_TOKENS, request_tokens: int = 0) -> Tuple[List[str], Dict[str, Any]]:
+    counters: Dict[str, int] = {}
+    chunks = list(iter_chunks(text, target_tokens, counters))
+    return chunks, chunk_stats(counters, request_tokens)
@@ -1,4 +1,5 @@
 import os
+import logging
 from pathlib import Path
 from datetime import datetime
 
@@ -9,6 +10,8 @@ load_dotenv()
 BASIC_URL = os.getenv("BASIC_URL")
 API_URL = os.getenv("DU_URL")
 VOTING_URL = os.getenv("VOTING_URL")
+SEJM_API_URL = os.getenv("SEJM_API_URL", "https://api.sejm.gov.pl/sejm")
+SEJM_TERM = int(os.getenv("SEJM_TERM", "10"))
 DATABASE_URL = os.getenv("DATABASE_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -18,10 +21,141 @@ LAST_KNOWN_FILE = Path("last_known.json")
 ACT_CONTENT_FILE = Path("act_content.txt")
 ELI_FOR_LATER = Path("eli_for_later.json")
 ACT_ANALYSIS_FILE = Path("act_analysis.json")
+LLM_CACHE_FILE = Path("llm_cache.sqlite3")
+EXTRACTED_TEXT_DIR = Path("extracted_texts")
+HTTP_CACHE_FILE = Path("http_cache.sqlite3")
+VOTINGS_STORE_FILE = Path("votings.sqlite3")
+RETRY_QUEUE_FILE = Path("retry_queue.sqlite3")
+CHECKPOINTS_FILE = Path("checkpoints.sqlite3")
+PROCESSED_ACTS_FILE = Path("processed_acts.sqlite3")
+METRICS_EVENTS_FILE = Path("metrics.jsonl")
+METRICS_PROM_FILE = Path("metrics.prom")
 
 MAX_ACTS_TO_PROCESS = 10
 PDF_DOWNLOAD_TIMEOUT = 30
 
+# Shared HTTP client (see http_client.py): timeouts in seconds, retries on 429/5xx with exponential backoff
+HTTP_TIMEOUT = 10
+HTTP_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_POOL_SIZE = 10
+HTTP_MAX_CONCURRENT_PER_HOST = 4
+
+# Conditional-request cache for JSON API responses. Within the TTL a response is served
+# from disk without any request; after it, the stored ETag/Last-Modified are revalidated.
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_TTL = {
+    "act_list": 5 * 60,
+    "act": 60 * 60,
+    "process": 60 * 60,
+    "default": 10 * 60,
+}
+# Entries not fetched or revalidated for this long are deleted (checked at most every HTTP_CACHE_PRUNE_INTERVAL)
+HTTP_CACHE_RETENTION = 30 * 24 * 60 * 60
+HTTP_CACHE_PRUNE_INTERVAL = 24 * 60 * 60
+PDF_MAX_BYTES = 50 * 1024 * 1024
+# Separator between pages in extracted PDF text, used to find repeated headers/footers
+PDF_PAGE_BREAK = "\f"
+
+# Backfill PDF extraction: PDFs downloaded per batch and pages per process-pool shard
+BACKFILL_BATCH_SIZE = 20
+PDF_PAGES_PER_SHARD = 50
+
+# Multi-year backfill (backfill.py --years): acts per pipeline run, pause between runs
+# in seconds and the cap on acts processed in one invocation (0 = no cap)
+BACKFILL_ACTS_PER_BATCH = 10
+BACKFILL_BATCH_PAUSE = 5
+BACKFILL_MAX_ACTS = 200
+
+# Batch summarization (batch_summaries.py): chunk summary requests go to the OpenAI Batch API as
+# JSONL job files kept in BATCH_DIR, split at the per-file limits; finished batches are polled for
+BATCH_JOBS_FILE = Path("batch_jobs.sqlite3")
+BATCH_DIR = Path("batches")
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_FILE_BYTES = 100 * 1024 * 1024
+BATCH_POLL_INTERVAL = 60
+
+# Worker limits for the act-processing pipeline stages (see pipeline.py).
+# The extract-and-map stage parses PDFs and summarizes their chunks as pages
+# come in, each act with up to SUMMARY_CONCURRENCY requests, so up to
+# PIPELINE_EXTRACT_MAP_WORKERS * SUMMARY_CONCURRENCY chunk requests are in
+# flight. The reduce stage runs the reduce and final analysis calls.
+PIPELINE_FETCH_WORKERS = 4
+PIPELINE_EXTRACT_MAP_WORKERS = 2
+PIPELINE_REDUCE_WORKERS = 3
+PIPELINE_CATEGORIZE_WORKERS = 2
+PIPELINE_PERSIST_BATCH_SIZE = 10
+
+# Parallel downloads when syncing all votings of a Sejm sitting into the local store
+VOTINGS_SYNC_WORKERS = 4
+
+# Retry queue for acts waiting on voting details: exponential backoff between
+# attempts (seconds), dead-lettered after RETRY_MAX_ATTEMPTS
+RETRY_BASE_DELAY = 60 * 60
+RETRY_MAX_DELAY = 7 * 24 * 60 * 60
+RETRY_MAX_ATTEMPTS = 15
+RETRY_BATCH_SIZE = 20
+
+# Postgres connection pool shared by all pipeline workers
+DB_POOL_MIN_CONNECTIONS = 1
+DB_POOL_MAX_CONNECTIONS = 5
+
+# Local category matching: similarity needed to skip the AI, and how many candidates the AI sees otherwise
+CATEGORY_SIMILARITY_THRESHOLD = 0.35
+CATEGORY_AI_CANDIDATES = 8
+CATEGORY_VECTOR_DIM = 2 ** 14
+
+# Chunks sent for summarization are packed from whole articles/paragraphs up to this many (estimated) tokens
+CHUNK_TARGET_TOKENS = 2500
+
+# Chunk summarization fan-out and OpenAI rate limits (per minute, shared by all threads)
+SUMMARY_CONCURRENCY = 4
+OPENAI_REQUESTS_PER_MINUTE = 300
+OPENAI_TOKENS_PER_MINUTE = 60000
+
+OPENAI_MODEL = "gpt-3.5-turbo"
+OPENAI_CONTEXT_TOKENS = 16385
+
+# USD per million input/output tokens, for the openai_cost_usd_total metric; Batch API requests are
+# billed at OPENAI_BATCH_PRICE_FACTOR of these prices
+OPENAI_PRICES = {
+    "gpt-3.5-turbo": {"in": 0.50, "out": 1.50},
+}
+OPENAI_BATCH_PRICE_FACTOR = 0.5
+
+# Tree reduce of chunk summaries: at most REDUCE_FAN_IN summaries and REDUCE_MAX_INPUT_TOKENS per call,
+# level after level, until they fit the final analysis call; REDUCE_MAX_TOKENS per merged summary
+REDUCE_FAN_IN = 10
+REDUCE_MAX_INPUT_TOKENS = 6000
+REDUCE_MAX_TOKENS = 400
+
+# Persistent cache of OpenAI responses, least recently used entries are evicted above this size
+LLM_CACHE_ENABLED = True
+LLM_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Resident mode (daemon.py). Polling interval in seconds by Warsaw local time: "peak" on weekdays
+# within DAEMON_PEAK_HOURS (when Dziennik Ustaw is usually published, and right after a run found new
+# acts), "day" within DAEMON_DAY_HOURS, "night" outside them and "weekend" on Saturdays and Sundays.
+DAEMON_TIMEZONE = "Europe/Warsaw"
+DAEMON_PEAK_HOURS = (8, 18)
+DAEMON_DAY_HOURS = (6, 22)
+DAEMON_INTERVALS = {
+    "peak": 5 * 60,
+    "day": 20 * 60,
+    "night": 60 * 60,
+    "weekend": 2 * 60 * 60,
+}
+# Health endpoint; reports "stalled" when a run is overdue or has been running for longer than this
+DAEMON_HEALTH_HOST = os.getenv("DAEMON_HEALTH_HOST", "127.0.0.1")
+DAEMON_HEALTH_PORT = int(os.getenv("DAEMON_HEALTH_PORT", "8080"))
+DAEMON_STALE_AFTER = 30 * 60
+DAEMON_MAX_FAILURES = 3
+
+# Per-act metrics as JSON lines (METRICS_EVENTS_FILE) plus a Prometheus text file written at the end of a run.
+# The JSON lines file is started afresh on every run, the previous run's is kept as metrics.jsonl.1
+METRICS_ENABLED = True
+
 REQUIRED_ENV_VARS = ["BASIC_URL", "DU_URL", "DATABASE_URL", "OPENAI_API_KEY"]
 
 def check_environment() -> bool:
@@ -29,4 +163,15 @@ def check_environment() -> bool:
     if missing_vars:
         print(f"ERROR: Missing environment variables: {', '.join(missing_vars)}")
         return False
-    return True
\ No newline at end of file
+    return True
+
+# Logging is set up once, by the entry point (main.py, backfill.py, daemon.py). An empty LOG_FILE logs to stderr.
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+def configure_logging() -> None:
+    logging.basicConfig(
+        filename=LOG_FILE or None,
+        level=LOG_LEVEL,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
\ No newline at end of file
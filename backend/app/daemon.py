@@ -0,0 +1,174 @@
+import json
+import time
+import signal
+import threading
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+import main
+import metrics
+from database import close_connection_pool
+from openai_analyzer import close_openai_client
+from config import (
+    DAEMON_TIMEZONE,
+    DAEMON_PEAK_HOURS,
+    DAEMON_DAY_HOURS,
+    DAEMON_INTERVALS,
+    DAEMON_HEALTH_HOST,
+    DAEMON_HEALTH_PORT,
+    DAEMON_STALE_AFTER,
+    DAEMON_MAX_FAILURES,
+    configure_logging,
+)
+
+# Resident mode: main.run() in a loop, in one process, so imports, the
+# OpenAI client, the HTTP session and caches and the DB pool stay warm
+# between runs. The act list is revalidated through the HTTP cache, so a run
+# with nothing new costs one conditional request.
+#
+# SIGTERM/SIGINT stop the loop; a run in progress is finished first. GET
+# /health answers 200 while runs succeed on schedule and 503 otherwise.
+#
+#   python daemon.py
+
+def polling_interval(now: datetime, found_new_acts: bool = False) -> int:
+    local = now.astimezone(ZoneInfo(DAEMON_TIMEZONE))
+    if local.weekday() >= 5:
+        period = "weekend"
+    elif found_new_acts or DAEMON_PEAK_HOURS[0] <= local.hour < DAEMON_PEAK_HOURS[1]:
+        # Acts tend to be published in batches, a hit makes the next one likely.
+        period = "peak"
+    elif DAEMON_DAY_HOURS[0] <= local.hour < DAEMON_DAY_HOURS[1]:
+        period = "day"
+    else:
+        period = "night"
+    return DAEMON_INTERVALS[period]
+
+class Daemon:
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.state: Dict[str, Any] = {
+            "startedAt": time.time(),
+            "runs": 0,
+            "running": False,
+            "lastRunStartedAt": None,
+            "lastRunFinishedAt": None,
+            "lastRunNewActs": None,
+            "lastSuccessAt": None,
+            "lastError": None,
+            "consecutiveFailures": 0,
+            "nextRunAt": None,
+        }
+
+    def health(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            state = dict(self.state)
+        if state["running"]:
+            stalled = now - state["lastRunStartedAt"] > DAEMON_STALE_AFTER
+        else:
+            stalled = state["nextRunAt"] is not None and now > state["nextRunAt"] + DAEMON_STALE_AFTER
+        if stalled:
+            state["status"] = "stalled"
+        elif state["consecutiveFailures"] >= DAEMON_MAX_FAILURES:
+            state["status"] = "failing"
+        else:
+            state["status"] = "ok"
+        return state
+
+    def _update(self, **changes: Any) -> None:
+        with self._lock:
+            self.state.update(changes)
+
+    def run_once(self) -> bool:
+        started = time.time()
+        self._update(running=True, lastRunStartedAt=started)
+        try:
+            new_acts = main.run()
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self.state.update(
+                    running=False,
+                    lastRunFinishedAt=time.time(),
+                    lastError=f"{type(e).__name__}: {e}",
+                    consecutiveFailures=self.state["consecutiveFailures"] + 1,
+                    runs=self.state["runs"] + 1,
+                )
+            metrics.inc("daemon_runs_total", result="failed")
+            return False
+
+        finished = time.time()
+        with self._lock:
+            self.state.update(
+                running=False,
+                lastRunFinishedAt=finished,
+                lastRunNewActs=new_acts,
+                lastSuccessAt=finished,
+                lastError=None,
+                consecutiveFailures=0,
+                runs=self.state["runs"] + 1,
+            )
+        metrics.inc("daemon_runs_total", result="ok")
+        metrics.observe("daemon_run_seconds", finished - started)
+        return True
+
+    def _health_server(self) -> ThreadingHTTPServer:
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/") != "/health":
+                    self.send_error(404)
+                    return
+                health = daemon.health()
+                body = json.dumps(health).encode("utf-8")
+                self.send_response(200 if health["status"] == "ok" else 503)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((DAEMON_HEALTH_HOST, DAEMON_HEALTH_PORT), Handler)
+        server.daemon_threads = True
+        return server
+
+    def stop(self, signum: Optional[int] = None, frame: Any = None) -> None:
+        if signum is not None:
+            print(f"Received {signal.Signals(signum).name}, stopping after the current run...")
+        self.stop_event.set()
+
+    def run_forever(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        server = self._health_server()
+        threading.Thread(target=server.serve_forever, name="health", daemon=True).start()
+        print(f"🩺 Health endpoint on http://{DAEMON_HEALTH_HOST}:{server.server_address[1]}/health")
+
+        try:
+            while not self.stop_event.is_set():
+                self.run_once()
+                found_new_acts = bool(self.state["lastRunNewActs"])
+                interval = polling_interval(datetime.now().astimezone(), found_new_acts)
+                self._update(nextRunAt=time.time() + interval)
+                print(f"⏳ Next check in {interval // 60} min")
+                self.stop_event.wait(interval)
+        finally:
+            server.shutdown()
+            server.server_close()
+            close_openai_client()
+            close_connection_pool()
+            metrics.export()
+            print("Stopped.")
+
+if __name__ == "__main__":
+    configure_logging()
+    Daemon().run_forever()
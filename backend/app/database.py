@@ -1,95 +1,186 @@
 import logging
 import psycopg2
 from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import os
+import sys
 import json
-from typing import Dict, Any, List, Optional
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 
 
 from contextlib import contextmanager
 from dotenv import load_dotenv
+from category_index import CategoryIndex, parse_keywords
+from votes_calculator import aggregate_vote_stats
+import metrics
+from config import BASIC_URL, DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS, CATEGORY_SIMILARITY_THRESHOLD, CATEGORY_AI_CANDIDATES
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 load_dotenv()
 
+_pool: Optional[ThreadedConnectionPool] = None
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_CONNECTIONS)
+_pool_lock = threading.Lock()
+_pool_metrics = {
+    "acquired": 0,
+    "inUse": 0,
+    "maxInUse": 0,
+    "waitSeconds": 0.0,
+    "discarded": 0,
+}
+
+def get_connection_pool() -> ThreadedConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            connection_string = os.getenv("DATABASE_URL")
+            if not connection_string:
+                raise ValueError("DATABASE_URL is not set in environment variables")
+            _pool = ThreadedConnectionPool(DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS, connection_string)
+        return _pool
+
+def get_pool_metrics() -> Dict[str, Any]:
+    with _pool_lock:
+        metrics = dict(_pool_metrics)
+    metrics["waitSeconds"] = round(metrics["waitSeconds"], 3)
+    metrics["maxSize"] = DB_POOL_MAX_CONNECTIONS
+    return metrics
+
+def close_connection_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+# Connections are borrowed from a process-wide pool. ThreadedConnectionPool
+# raises instead of blocking when it is exhausted, so a semaphore of the same
+# size makes callers wait for a free connection.
 @contextmanager
 def get_db_connection():
-    connection_string = os.getenv("DATABASE_URL")
-    if not connection_string:
-        raise ValueError("DATABASE_URL is not set in environment variables")
+    pool = get_connection_pool()
+    started = time.monotonic()
+    _pool_slots.acquire()
     
     conn = None
     cursor = None
     try:
-        conn = psycopg2.connect(connection_string)
+        conn = pool.getconn()
+        waited = time.monotonic() - started
+        metrics.observe("db_pool_wait_seconds", waited)
+        with _pool_lock:
+            _pool_metrics["acquired"] += 1
+            _pool_metrics["waitSeconds"] += waited
+            _pool_metrics["inUse"] += 1
+            _pool_metrics["maxInUse"] = max(_pool_metrics["maxInUse"], _pool_metrics["inUse"])
         cursor = conn.cursor()
         yield conn, cursor
     except Exception as e:
-        if conn:
+        if conn and not conn.closed:
             conn.rollback()
         raise
     finally:
-        if cursor:
+        if cursor and not cursor.closed:
             cursor.close()
         if conn:
-            conn.close()
+            broken = bool(conn.closed)
+            if not broken:
+                # Never hand out a connection with an open transaction.
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            pool.putconn(conn, close=broken)
+            with _pool_lock:
+                _pool_metrics["inUse"] -= 1
+                if broken:
+                    _pool_metrics["discarded"] += 1
+        _pool_slots.release()
+
+@contextmanager
+def db_transaction():
+    with metrics.timer("db_transaction_seconds"), get_db_connection() as (conn, cursor):
+        yield cursor
+        conn.commit()
+
+# Runs one step either in its own transaction or, when a cursor is passed,
+# inside the caller's transaction behind a savepoint, so a failed statement
+# does not abort the rest of the caller's work.
+@contextmanager
+def _db_step(cursor=None):
+    if cursor is None:
+        with db_transaction() as own_cursor:
+            yield own_cursor
+        return
+
+    cursor.execute("SAVEPOINT db_step")
+    try:
+        yield cursor
+    except Exception:
+        cursor.execute("ROLLBACK TO SAVEPOINT db_step")
+        raise
+    cursor.execute("RELEASE SAVEPOINT db_step")
+
+_category_index: Optional[CategoryIndex] = None
+_category_index_lock = threading.Lock()
+
+def get_category_index(cursor=None) -> CategoryIndex:
+    global _category_index
+    with _category_index_lock:
+        if _category_index is None:
+            categories = get_all_categories_with_keywords(cursor)
+            if categories is None:
+                # Do not cache a failed load, the next call retries it.
+                return CategoryIndex()
+            _category_index = CategoryIndex(categories)
+            logger.info(f"Loaded category index with {len(_category_index)} categories")
+        return _category_index
+
+def reset_category_index() -> None:
+    global _category_index
+    with _category_index_lock:
+        _category_index = None
+
+_category_matcher: Optional[Tuple[CategoryIndex, int, Any]] = None
+
+# The matcher's vectors are rebuilt whenever the index it was built from
+# changes (new category or extended keywords).
+def get_category_matcher(cursor=None):
+    from category_matcher import CategoryMatcher
+    global _category_matcher
+    index = get_category_index(cursor)
+    with _category_index_lock:
+        if _category_matcher is None or _category_matcher[0] is not index or _category_matcher[1] != index.version:
+            _category_matcher = (index, index.version, CategoryMatcher(index.categories()))
+        return _category_matcher[2]
+
+def _update_category_index(category_name: str, keywords: List[str]) -> None:
+    with _category_index_lock:
+        index = _category_index
+    if index is not None:
+        index.set_category(category_name, keywords)
 
-def find_category_by_keywords(keywords):
+def find_category_by_keywords(keywords, cursor=None):
     if not keywords:
         return None
     
-    try:
-        with get_db_connection() as (conn, cursor):
-            cursor.execute("""
-                SELECT category FROM category 
-                WHERE EXISTS (
-                    SELECT 1 FROM json_array_elements_text(keywords) AS keyword
-                    WHERE keyword = ANY(%s)
-                ) LIMIT 1
-            """, (keywords,))
-            result = cursor.fetchone()
-            return result[0] if result else None
-    except Exception as e:
-        logger.error(f"JSON approach failed: {e}")
-    
-    try:
-        with get_db_connection() as (conn, cursor):
-            cursor.execute("""
-                SELECT category FROM category 
-                WHERE EXISTS (
-                    SELECT 1 FROM jsonb_array_elements_text(keywords::jsonb) AS keyword
-                    WHERE keyword = ANY(%s)
-                ) LIMIT 1
-            """, (keywords,))
-            result = cursor.fetchone()
-            return result[0] if result else None
-    except Exception as e:
-        logger.error(f"JSONB approach failed: {e}")
-    
-    try:
-        with get_db_connection() as (conn, cursor):
-            cursor.execute("""
-                SELECT category FROM category 
-                WHERE keywords::text LIKE ANY(
-                    SELECT '%"' || keyword || '"%' 
-                    FROM unnest(%s) AS keyword
-                ) LIMIT 1
-            """, (keywords,))
-            result = cursor.fetchone()
-            return result[0] if result else None
-    except Exception as e:
-        logger.error(f"Text search approach failed: {e}")
+    ranked = get_category_index(cursor).rank(keywords)
+    if not ranked:
         return None
-    
-def get_all_categories_with_keywords():
+    if len(ranked) > 1:
+        logger.info(f"Category candidates by keyword overlap: {ranked[:5]}")
+    return ranked[0][0]
+
+def get_all_categories_with_keywords(cursor=None):
     try:
-        with get_db_connection() as (conn, cursor):
-            cursor.execute(
+        with _db_step(cursor) as cur:
+            cur.execute(
                 "SELECT category, keywords FROM category ORDER BY category"
             )
-            results = cursor.fetchall()
+            results = cur.fetchall()
             
             categories_data = []
             for row in results:
@@ -105,38 +196,87 @@ def get_all_categories_with_keywords():
         logger.error(f"Error fetching categories: {e}")
         return None
 
-def save_to_database(filtered_item: Dict[str, Any]) -> bool:
+# Categorization is done in two steps. decide_category (keyword index,
+# similarity, AI fallback) holds no connection: the AI call can take a minute
+# with retries. apply_category_decision writes the new or extended category
+# in the transaction that upserts the act, so either the act is saved
+# together with its category changes, or nothing is.
+def decide_category(filtered_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     keywords = filtered_item.get("keywords", [])
-    category_name = None
+    decision = None
     
     if isinstance(keywords, list) and keywords:
-        category_name = smart_find_category_by_keywords(
+        decision = smart_find_category_by_keywords(
             keywords, 
             filtered_item.get("title", ""), 
             filtered_item.get("content", "")
         )
     
-    if not category_name:
-        all_categories = get_all_categories_with_keywords()
+    if not decision:
+        all_categories = get_category_index().categories()
         if all_categories:
             logger.info("Available categories with keywords:")
             logger.info(json.dumps(all_categories, indent=2, ensure_ascii=False))
         else:
             logger.info("No categories found or error occurred")
-    
-    insert_query = """
-    INSERT INTO acts (
-        title, act_number, simple_title, content, refs, texts, item_type,
-        announcement_date, change_date, promulgation, item_status, comments,
-        keywords, file, votes, category
-    ) VALUES %s
-    """
-    
+
+    return decision
+
+# Keywords written for new or extended categories are collected in
+# index_updates; the caller applies them to the index once it has committed.
+def apply_category_decision(cursor, decision: Optional[Dict[str, Any]], index_updates: Dict[str, List[str]]) -> Optional[str]:
+    if not decision:
+        return None
+    action = decision["action"]
+    if action == "extend":
+        keywords = extend_category_keywords(decision["category"], decision["keywords"], cursor=cursor)
+    elif action == "create":
+        keywords = create_new_category(decision["category"], decision["keywords"], cursor=cursor)
+    else:
+        return decision["category"]
+    if keywords is None:
+        return None
+    index_updates[decision["category"]] = keywords
+    return decision["category"]
+
+def save_to_database(filtered_item: Dict[str, Any]) -> bool:
+    return save_many_to_database([filtered_item])
+
+def save_many_to_database(filtered_items: List[Dict[str, Any]]) -> bool:
+    return upsert_acts(filtered_items, [decide_category(item) for item in filtered_items])
+
+def upsert_acts(filtered_items: List[Dict[str, Any]], decisions: List[Optional[Dict[str, Any]]]) -> bool:
+    index_updates: Dict[str, List[str]] = {}
+    try:
+        with metrics.timer("db_upsert_seconds"), db_transaction() as cursor:
+            category_names = [apply_category_decision(cursor, decision, index_updates) for decision in decisions]
+            _execute_upsert(cursor, filtered_items, category_names)
+        # Only committed categories reach the index, a rolled back batch leaves it as it was.
+        for category_name, keywords in index_updates.items():
+            _update_category_index(category_name, keywords)
+        logger.info(f"Data saved successfully ({len(filtered_items)} acts).")
+        return True
+    except Exception as e:
+        logger.error(f"Error during data save: {e}")
+        return False
+
+# Acts are keyed by their ELI so a replayed act updates its row instead of
+# inserting a duplicate. The eli unique index and the vote_stats tables are
+# declared in frontend/prisma/schema.prisma and created by prisma db push,
+# never at runtime.
+ACT_COLUMNS = [
+    "eli", "title", "act_number", "simple_title", "content", "refs", "texts", "item_type",
+    "announcement_date", "change_date", "promulgation", "item_status", "comments",
+    "keywords", "file", "votes", "category"
+]
+
+def _act_row(filtered_item: Dict[str, Any], category_name: Optional[str]) -> tuple:
     references = json.dumps(filtered_item.get("references")) if filtered_item.get("references") is not None else None
     texts = json.dumps(filtered_item.get("texts")) if filtered_item.get("texts") is not None else None
     votes = json.dumps(filtered_item.get("votes")) if filtered_item.get("votes") is not None else None
     
-    data_tuple = (
+    return (
+        filtered_item.get("eli"),
         filtered_item.get("title"),
         filtered_item.get("actNumber"),
         filtered_item.get("simpleTitle"),
@@ -154,79 +294,173 @@ def save_to_database(filtered_item: Dict[str, Any]) -> bool:
         votes,
         category_name
     )
+
+def _execute_upsert(cursor, filtered_items: List[Dict[str, Any]], category_names: List[Optional[str]]) -> None:
+    if not filtered_items:
+        return
+
+    # ON CONFLICT cannot touch the same row twice in one statement, so only
+    # the last occurrence of an ELI in the batch is kept.
+    entries_by_eli = {}
+    for item, category_name in zip(filtered_items, category_names):
+        entries_by_eli[item.get("eli") or id(item)] = (item, category_name)
+    entries = list(entries_by_eli.values())
+    rows = [_act_row(item, category_name) for item, category_name in entries]
+
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in ACT_COLUMNS[1:])
+    upsert_query = f"""
+    INSERT INTO acts ({", ".join(ACT_COLUMNS)}) VALUES %s
+    ON CONFLICT (eli) DO UPDATE SET {updates}
+    RETURNING eli, (xmax = 0) AS inserted
+    """
+    returned = execute_values(cursor, upsert_query, rows, page_size=len(rows), fetch=True)
+
+    # Only acts inserted for the first time feed the vote aggregates, so a
+    # replayed act is not counted twice.
+    updated_elis = {eli for eli, inserted in returned if eli and not inserted}
+    _update_vote_stats(cursor, [
+        (item, category_name) for item, category_name in entries
+        if not item.get("eli") or item.get("eli") not in updated_elis
+    ])
+
+def _update_vote_stats(cursor, entries: List[Tuple[Dict[str, Any], Optional[str]]]) -> None:
+    club_rows, group_rows = aggregate_vote_stats(entries)
+
+    if club_rows:
+        execute_values(cursor, """
+        INSERT INTO vote_stats_club (club, category, month, acts, yes, no, abstain, absent, total) VALUES %s
+        ON CONFLICT (club, category, month) DO UPDATE SET
+            acts = vote_stats_club.acts + EXCLUDED.acts,
+            yes = vote_stats_club.yes + EXCLUDED.yes,
+            no = vote_stats_club.no + EXCLUDED.no,
+            abstain = vote_stats_club.abstain + EXCLUDED.abstain,
+            absent = vote_stats_club.absent + EXCLUDED.absent,
+            total = vote_stats_club.total + EXCLUDED.total
+        """, club_rows, page_size=len(club_rows))
+
+    if group_rows:
+        execute_values(cursor, """
+        INSERT INTO vote_stats_group (category, month, acts, government_yes, opposition_yes, total_yes, total) VALUES %s
+        ON CONFLICT (category, month) DO UPDATE SET
+            acts = vote_stats_group.acts + EXCLUDED.acts,
+            government_yes = vote_stats_group.government_yes + EXCLUDED.government_yes,
+            opposition_yes = vote_stats_group.opposition_yes + EXCLUDED.opposition_yes,
+            total_yes = vote_stats_group.total_yes + EXCLUDED.total_yes,
+            total = vote_stats_group.total + EXCLUDED.total
+        """, group_rows, page_size=len(group_rows))
     
+# Current keywords are read from the table, locked, in the writing
+# transaction: the AI only saw the top candidates, and other acts of the same
+# batch may have extended the category already.
+def _locked_category_keywords(cursor, category_name: str) -> Optional[List[str]]:
+    cursor.execute("SELECT keywords FROM category WHERE category = %s FOR UPDATE", (category_name,))
+    row = cursor.fetchone()
+    return parse_keywords(row[0]) if row else None
+
+# The category helpers return the keywords they wrote. They do not touch the
+# category index: with a cursor the write is not committed yet.
+def extend_category_keywords(category_name: str, new_keywords: List[str], cursor=None) -> Optional[List[str]]:
     try:
-        with get_db_connection() as (conn, cursor):
-            execute_values(cursor, insert_query, [data_tuple])
-            conn.commit()
-        logger.info("Data saved successfully.")
-        return True
-    except Exception as e:
-        logger.error(f"Error during data save: {e}")
-        return False
-    
-def extend_category_keywords(category_name: str, new_keywords: List[str], all_categories: List[Dict[str, Any]]) -> Optional[str]:
-    try:
-        current_keywords = []
-        for category_data in all_categories:
-            if category_data.get("category") == category_name:
-                cat_keywords = category_data.get("keywords", [])
-                if isinstance(cat_keywords, str):
-                    try:
-                        current_keywords = json.loads(cat_keywords)
-                    except json.JSONDecodeError:
-                        current_keywords = [cat_keywords]
-                elif isinstance(cat_keywords, list):
-                    current_keywords = cat_keywords
-                break
-        
-        all_keywords = list(set(current_keywords + new_keywords))
-        
-        with get_db_connection() as (conn, cursor):
-            cursor.execute(
+        with _db_step(cursor) as cur:
+            current_keywords = _locked_category_keywords(cur, category_name)
+            if current_keywords is None:
+                logger.warning(f"Cannot extend non-existent category: {category_name}")
+                return None
+            all_keywords = list(dict.fromkeys(current_keywords + new_keywords))
+            cur.execute(
                 "UPDATE category SET keywords = %s WHERE category = %s",
                 (json.dumps(all_keywords), category_name)
             )
-            conn.commit()
             
         logger.info(f"Extended category '{category_name}' with {len(new_keywords)} new keywords")
-        return category_name
+        return all_keywords
         
     except Exception as e:
         logger.error(f"Error extending category: {e}")
         return None
 
-def create_new_category(category_name: str, keywords: List[str]) -> Optional[str]:
+def create_new_category(category_name: str, keywords: List[str], cursor=None) -> Optional[List[str]]:
     try:
-        unique_keywords = list(set(keywords))
+        unique_keywords = list(dict.fromkeys(keywords))
         
-        with get_db_connection() as (conn, cursor):
-            cursor.execute(
+        with _db_step(cursor) as cur:
+            if _locked_category_keywords(cur, category_name) is not None:
+                # Created since the decision was made, e.g. by an earlier act of the batch.
+                return extend_category_keywords(category_name, unique_keywords, cursor=cur)
+            cur.execute(
                 "INSERT INTO category (category, keywords) VALUES (%s, %s)",
                 (category_name, json.dumps(unique_keywords))
             )
-            conn.commit()
             
         logger.info(f"Created new category '{category_name}' with {len(unique_keywords)} keywords")
-        return category_name
+        return unique_keywords
         
     except Exception as e:
         logger.error(f"Error creating new category: {e}")
         return None
 
-def smart_find_category_by_keywords(keywords: List[str], title: str = "", content: str = "") -> Optional[str]:
+def smart_find_category_by_keywords(keywords: List[str], title: str = "", content: str = "") -> Optional[Dict[str, Any]]:
     from openai_analyzer import find_or_create_category_with_ai
     if not keywords:
         return None
     
     existing_category = find_category_by_keywords(keywords)
     if existing_category:
-        return existing_category
+        return {"action": "match", "category": existing_category}
     
-    all_categories = get_all_categories_with_keywords()
-    if not all_categories:
+    matcher = get_category_matcher()
+    if not matcher.names:
         logger.warning("No categories found in database")
         return None
-    
-    logger.info("No exact category match found, using AI for smart categorization")
-    return find_or_create_category_with_ai(keywords, all_categories, title, content)
\ No newline at end of file
+
+    ranked = matcher.rank(keywords, title, content)
+    best_category, best_score = ranked[0]
+    if best_score >= CATEGORY_SIMILARITY_THRESHOLD:
+        logger.info(f"Matched category '{best_category}' by similarity {best_score:.2f}")
+        return {"action": "match", "category": best_category}
+
+    # Only the closest categories go into the prompt, not the whole taxonomy.
+    candidates = matcher.top_categories(ranked, CATEGORY_AI_CANDIDATES)
+    logger.info(f"No close category match (best {best_score:.2f}), using AI with {len(candidates)} candidates")
+    return find_or_create_category_with_ai(keywords, candidates, title, content)
+
+PDF_SUFFIX = "/text.pdf"
+
+# Acts saved before the eli column existed have it NULL, so the upsert's
+# ON CONFLICT (eli) never matches them and a replay inserts a second row.
+# Their ELI is the file URL ({BASIC_URL}{eli}/text.pdf) without its prefix
+# and suffix. One-off, after prisma db push added the column. Of several rows
+# with the same ELI only the newest gets it; an ELI already in the table is
+# not given out again.
+def fill_missing_eli() -> Tuple[int, int]:
+    if not BASIC_URL:
+        raise ValueError("BASIC_URL is not set in environment variables")
+    with db_transaction() as cursor:
+        cursor.execute("""
+        WITH recovered AS (
+            SELECT DISTINCT ON (eli) id, eli FROM (
+                SELECT id, left(substr(file, %s), -%s) AS eli FROM acts
+                WHERE eli IS NULL AND left(file, %s) = %s AND right(file, %s) = %s
+            ) candidates
+            WHERE eli <> ''
+            ORDER BY eli, id DESC
+        )
+        UPDATE acts SET eli = recovered.eli FROM recovered
+        WHERE acts.id = recovered.id AND NOT EXISTS (SELECT 1 FROM acts taken WHERE taken.eli = recovered.eli)
+        """, (
+            len(BASIC_URL) + 1, len(PDF_SUFFIX),
+            len(BASIC_URL), BASIC_URL, len(PDF_SUFFIX), PDF_SUFFIX
+        ))
+        filled = cursor.rowcount
+        cursor.execute("SELECT COUNT(*) FROM acts WHERE eli IS NULL")
+        remaining = cursor.fetchone()[0]
+    return filled, remaining
+
+if __name__ == "__main__":
+    # python database.py fill-eli
+    if len(sys.argv) > 1 and sys.argv[1] == "fill-eli":
+        filled, remaining = fill_missing_eli()
+        print(f"Filled eli of {filled} acts, {remaining} acts still without one.")
+    else:
+        print("Usage: python database.py fill-eli")
+        sys.exit(1)
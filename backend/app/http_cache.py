@@ -0,0 +1,127 @@
+import re
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import http_client
+import metrics
+from local_store import open_sqlite
+from config import HTTP_CACHE_FILE, HTTP_CACHE_TTL, HTTP_CACHE_ENABLED, HTTP_CACHE_RETENTION, HTTP_CACHE_PRUNE_INTERVAL
+
+# Disk cache for JSON responses of the ELI and Sejm APIs. Fresh entries are
+# served without touching the network; stale ones are revalidated with
+# If-None-Match / If-Modified-Since, and a 304 is answered from disk.
+# Every act and process URL adds a row, so rows not fetched or revalidated
+# for HTTP_CACHE_RETENTION are deleted. Votings are kept in votings_store.py.
+
+ENDPOINT_PATTERNS = [
+    ("process", re.compile(r"/processes/")),
+    ("act_list", re.compile(r"/eli/acts/[^/]+/\d{4}/?$")),
+    ("act", re.compile(r"/eli/acts/")),
+]
+
+def endpoint_type(url: str) -> str:
+    for name, pattern in ENDPOINT_PATTERNS:
+        if pattern.search(url):
+            return name
+    return "default"
+
+class HttpCache:
+    def __init__(self, path: Path):
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS http_cache_fetched_at ON http_cache (fetched_at)")
+        self.prune()
+
+    def lookup(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], str, float]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body, fetched_at FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], body: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, time.time())
+            )
+        # A resident process (daemon.py) opens the cache once.
+        if time.time() - self._pruned_at > HTTP_CACHE_PRUNE_INTERVAL:
+            self.prune()
+
+    def prune(self) -> int:
+        now = time.time()
+        with self._lock:
+            self._pruned_at = now
+            deleted = self._conn.execute("DELETE FROM http_cache WHERE fetched_at < ?", (now - HTTP_CACHE_RETENTION,)).rowcount
+        if deleted:
+            metrics.inc("http_cache_pruned_total", deleted)
+        return deleted
+
+    def touch(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def get_json(self, url: str) -> Any:
+        entry = self.lookup(url)
+        headers = {}
+        if entry:
+            etag, last_modified, body, fetched_at = entry
+            ttl = HTTP_CACHE_TTL.get(endpoint_type(url), HTTP_CACHE_TTL["default"])
+            if time.time() - fetched_at < ttl:
+                self.hits += 1
+                metrics.inc("http_cache_requests_total", result="hit", endpoint=endpoint_type(url))
+                return json.loads(body)
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = http_client.get(url, headers=headers)
+        if response.status_code == 304 and entry:
+            self.revalidated += 1
+            metrics.inc("http_cache_requests_total", result="revalidated", endpoint=endpoint_type(url))
+            self.touch(url)
+            return json.loads(entry[2])
+
+        response.raise_for_status()
+        data = response.json()
+        self.misses += 1
+        metrics.inc("http_cache_requests_total", result="miss", endpoint=endpoint_type(url))
+        self.store(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), response.text)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+def get_http_cache() -> HttpCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache(HTTP_CACHE_FILE)
+        return _cache
+
+def get_json(url: str) -> Any:
+    if not HTTP_CACHE_ENABLED:
+        response = http_client.get(url)
+        response.raise_for_status()
+        return response.json()
+    return get_http_cache().get_json(url)
@@ -0,0 +1,85 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+from config import (
+    HTTP_TIMEOUT,
+    HTTP_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_POOL_SIZE,
+    HTTP_MAX_CONCURRENT_PER_HOST,
+)
+
+# One keep-alive session for every call to the ELI and Sejm APIs. Connections
+# are pooled per host by urllib3, 429/5xx responses are retried with backoff
+# (honouring Retry-After), and a semaphore per host caps parallel requests.
+
+_session: Optional[requests.Session] = None
+_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+_lock = threading.Lock()
+
+def _create_session() -> requests.Session:
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _create_session()
+        return _session
+
+def _host_limit(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(HTTP_MAX_CONCURRENT_PER_HOST)
+        return _host_limits[host]
+
+def _record(url: str, started: float, response: Optional[requests.Response]) -> None:
+    host = urlsplit(url).netloc
+    metrics.observe("http_request_seconds", time.perf_counter() - started, host=host)
+    metrics.inc("http_requests_total", host=host, status=response.status_code if response is not None else "error")
+
+def get(url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    with _host_limit(url):
+        started = time.perf_counter()
+        response = None
+        try:
+            response = get_session().get(url, timeout=timeout or HTTP_TIMEOUT, **kwargs)
+            return response
+        finally:
+            _record(url, started, response)
+
+# The host slot is held until the body has been read and the response closed.
+@contextmanager
+def stream(url: str, timeout: Optional[float] = None) -> Iterator[requests.Response]:
+    with _host_limit(url):
+        started = time.perf_counter()
+        response = None
+        try:
+            response = get_session().get(url, timeout=timeout or HTTP_TIMEOUT, stream=True)
+            yield response
+        finally:
+            if response is not None:
+                response.close()
+            _record(url, started, response)
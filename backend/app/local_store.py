@@ -0,0 +1,11 @@
+import sqlite3
+from pathlib import Path
+
+# Shared setup for the small SQLite files the backend keeps next to
+# last_known.json. Connections are opened in autocommit mode and may be used
+# from several threads, callers serialize access with their own lock.
+def open_sqlite(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -1,33 +1,21 @@
-import os
 import json
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple
 from datetime import datetime
 
-from openai_analyzer import split_and_analyze_text, save_analysis_to_file
+from openai_analyzer import save_analysis_to_file
 from pdf_utils import pdf_to_text, save_text_to_file
 from storage import get_last_known, save_last_known
-from api import fetch_api_data, fetch_one_law, get_voting_data
-from votes_calculator import get_sejm_voting_data
-from database import save_to_database
-from config import BASIC_URL, MAX_ACTS_TO_PROCESS, ACT_CONTENT_FILE, ACT_ANALYSIS_FILE, ELI_FOR_LATER, check_environment
-
-def extract_last_vote_info(process_data: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
-    stages = process_data.get("stages", [])
-    last_vote = None
-
-    for stage in stages:
-        stage_entries = stage.get("children", []) if "children" in stage else [stage]
-
-        for entry in stage_entries:
-            if entry.get("stageName", "").lower() == "głosowanie":
-                last_vote = entry
-
-    if last_vote and "voting" in last_vote:
-        sitting = last_vote["voting"].get("sitting")
-        voting_number = last_vote["voting"].get("votingNumber")
-        return sitting, voting_number
-
-    return None, None
+from api import fetch_api_data, fetch_one_law, get_voting_details
+from database import save_to_database, get_pool_metrics, reset_category_index
+from pipeline import build_filtered_item, run_pipeline, analyze_act, load_act_details, load_voting_details
+from checkpoints import get_checkpoints, TEXT
+from llm_cache import get_llm_cache
+from http_cache import get_http_cache
+import metrics
+from retry_queue import get_retry_queue, DEAD, PENDING
+from processed_acts import get_processed_acts
+from run_memo import run_scope
+from config import BASIC_URL, CURRENT_YEAR, MAX_ACTS_TO_PROCESS, ACT_CONTENT_FILE, ACT_ANALYSIS_FILE, ELI_FOR_LATER, LLM_CACHE_ENABLED, RETRY_BATCH_SIZE, check_environment, configure_logging
 
 def get_new_acts(items: List[Dict[str, Any]], last_known: Dict[str, Any]) -> List[Dict[str, Any]]:
     new_acts = []
@@ -38,17 +26,7 @@ def get_new_acts(items: List[Dict[str, Any]], last_known: Dict[str, Any]) -> Lis
     return new_acts
 
 def save_eli_to_check_later(act_eli):
-    try:
-        with open(ELI_FOR_LATER, "r") as f:
-            existing_eli = [line.strip() for line in f.readlines()]
-    except FileNotFoundError:
-        existing_eli = []
-
-    if act_eli not in existing_eli:
-        existing_eli.append(act_eli)
-        with open(ELI_FOR_LATER, "w") as f:
-            for eli in existing_eli:
-                f.write(f"{eli}\n")
+    get_retry_queue().enqueue(act_eli)
 
 def check_voting_details(act_eli: str ):
     act_details = fetch_one_law(act_eli)
@@ -70,61 +48,36 @@ def process_and_save_act(latest: Dict[str, Any], text: str) -> bool:
         print(f"Error: No text for act {latest.get('title', 'unknown')}")
         return False
         
+    eli = latest.get("ELI")
+    checkpoints = get_checkpoints()
+    saved = checkpoints.load(eli)
+    if TEXT not in saved:
+        checkpoints.save(eli, TEXT, text)
+
     save_text_to_file(text, str(ACT_CONTENT_FILE))
     
-    analysis = split_and_analyze_text(text)
+    analysis = analyze_act(eli, text, saved)
     save_analysis_to_file(analysis, str(ACT_ANALYSIS_FILE))
     
     analysis_dict = analysis if isinstance(analysis, dict) else json.loads(analysis)
     
-    eli = latest.get("ELI")
-    act_number = eli.split("/")[-1] if eli else None
-    act_details = fetch_one_law(eli)
+    act_details = load_act_details(eli, saved)
     
     if not act_details:
         print(f"Error: Could not fetch details for act {eli}")
         return False
 
-    voting_details = get_voting_details(act_details)
+    voting_details = load_voting_details(eli, act_details, saved)
+    filtered_item = build_filtered_item(eli, act_details, analysis_dict, voting_details)
 
-    filtered_item = {
-        "title": act_details.get("title"),
-        "actNumber": act_number,
-        "simpleTitle": analysis_dict.get("title"),
-        "content": analysis_dict.get("content_html"),
-        "references": act_details.get("references"),
-        "texts": act_details.get("texts"),
-        "type": act_details.get("type"),
-        "announcementDate": act_details.get("announcementDate"),
-        "changeDate": act_details.get("changeDate"),
-        "promulgation": act_details.get("promulgation"),
-        "status": act_details.get("status"),
-        "comments": act_details.get("comments"),
-        "keywords": act_details.get("keywords"),
-        "file": f"{BASIC_URL}{eli}/text.pdf",
-        "votes": voting_details
-    }
-
-    return save_to_database(filtered_item)
-
-def get_voting_details(act_details: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    voting_details = None
-    prints = act_details.get("prints", [])
-    
-    if prints and isinstance(prints, list):
-        process_api_link = prints[0].get("linkProcessAPI")
-        if process_api_link:
-            voting_data = get_voting_data(process_api_link)
-            if voting_data:
-                sitting, voting_number = extract_last_vote_info(voting_data)
-                if sitting and voting_number:
-                    voting_details = get_sejm_voting_data(10, sitting, voting_number)
-    
-    return voting_details
+    success = save_to_database(filtered_item)
+    if success:
+        checkpoints.clear(eli)
+    return success
 
 # Function to fetch and filters acts. Filter it by type, only "Ustawa" and "Rozporządzenie" are allowed. Sort it by promulgation date descending (most recent at the top).
-def fetch_and_filter_acts() -> List[Dict[str, Any]]:
-    items = fetch_api_data()
+def fetch_and_filter_acts(year: Optional[int] = None) -> List[Dict[str, Any]]:
+    items = fetch_api_data(year)
     if not items:
         print("Error: Failed to fetch data from API")
         return []
@@ -141,36 +94,64 @@ def fetch_and_filter_acts() -> List[Dict[str, Any]]:
     
     return filtered_items
 
-# Checking if file with last known act exists. If not, process all available acts. If exists, process only new acts until the last known one.
-def identify_new_acts(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+# Seeding the processed set of a year from the last known act (the old single marker): it and everything older counts as processed.
+def seed_processed_from_last_known(items: List[Dict[str, Any]], year: int) -> Set[str]:
     last_known = get_last_known()
+    elis = [act["ELI"] for act in items]
 
-    if not last_known:
+    if not last_known or last_known.get("ELI") not in elis:
         print("📄 No previously saved act found — processing all available legal acts...")
-        return items
+        return set()
+
+    seeded = elis[elis.index(last_known["ELI"]):]
+    get_processed_acts().mark(year, seeded)
+    return set(seeded)
+
+# Acts not in the processed set of the year are new. Laws without voting details yet go to the retry queue instead.
+def identify_new_acts(items: List[Dict[str, Any]], year: int = CURRENT_YEAR) -> List[Dict[str, Any]]:
+    processed_acts = get_processed_acts()
+    processed = processed_acts.elis(year)
+
+    if not processed:
+        processed = seed_processed_from_last_known(items, year)
     
     new_acts = []
+    queued = []
 
     for act in items:
-        if act["ELI"] == last_known.get("ELI"):
-            break
+        if act["ELI"] in processed:
+            continue
 
         print(act['type'], act['ELI'])
 
         if act['type'] in ["Ustawa"]:
             if check_voting_details(act["ELI"]):
                 new_acts.append(act)
+            elif act["ELI"] in get_retry_queue():
+                queued.append(act["ELI"])
         else:
             new_acts.append(act)
+
+    processed_acts.mark(year, queued)
     
     return new_acts
 
+# Every act the pipeline was given counts as processed. Failed ones go to the
+# retry queue, which retries them with backoff and gives up after
+# RETRY_MAX_ATTEMPTS, instead of every run picking them up again.
+def record_pipeline_results(year: int, results: List[Tuple[Dict[str, Any], bool]]) -> None:
+    queue = get_retry_queue()
+    for act, success in results:
+        if not success and queue.fail(act["ELI"], "Processing failed") == DEAD:
+            print(f"☠️ Giving up on {act['ELI']} after repeated failures")
+    get_processed_acts().mark(year, [act["ELI"] for act, _ in results])
+
 # Checking if single_act has text, if not, skip it. If yes, process it and save to database.
 def process_single_act(act: Dict[str, Any]) -> bool:
     print(f"➡️ Processing act: {act.get('title', 'unknown')}")
     
     pdf_url = f"{BASIC_URL}{act.get('ELI')}/text.pdf"
-    pdf_text = pdf_to_text(pdf_url)
+    pdf_text = get_checkpoints().load(act.get("ELI")).get(TEXT) or pdf_to_text(pdf_url)
     
     if not pdf_text:
         print(f"❌ Failed to fetch PDF text for act: {act.get('title')}")
@@ -185,71 +166,107 @@ def process_single_act(act: Dict[str, Any]) -> bool:
     
     return success
 
-def check_for_new_acts() -> None:
+def check_for_new_acts() -> int:
     if not check_environment():
         print("Error: Missing required environment variables")
-        return
+        return 0
     
-    items = fetch_and_filter_acts()
+    # Evaluated per run, a resident process (daemon.py) may outlive the year.
+    year = datetime.now().year
+    items = fetch_and_filter_acts(year)
 
     if not items:
-        return
+        return 0
+
+    # Pick up category changes made outside this process since the last run.
+    reset_category_index()
     
-    new_acts = identify_new_acts(items)
+    new_acts = identify_new_acts(items, year)
     
     if new_acts:
         print(f"🔔 Found {len(new_acts)} new legal acts!")
         
         acts_to_process = new_acts[:MAX_ACTS_TO_PROCESS]
         
-        for act in reversed(acts_to_process):
-            process_single_act(act)
+        # Oldest first, so acts are persisted in promulgation order. Failed acts are
+        # retried from the queue, resuming from their checkpoints.
+        results = run_pipeline(list(reversed(acts_to_process)))
+        record_pipeline_results(year, results)
+
+        if LLM_CACHE_ENABLED:
+            stats = get_llm_cache().stats()
+            print(f"🗄️ LLM cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+        pool = get_pool_metrics()
+        print(f"🗄️ DB pool: {pool['acquired']} checkouts, max {pool['maxInUse']}/{pool['maxSize']} in use, waited {pool['waitSeconds']}s")
 
         if new_acts:
             save_last_known(new_acts[0])
     else:
         print("No new legal acts.")
 
+    return len(new_acts)
+
 def check_old_eli() -> None:
-    try:
-        with open(ELI_FOR_LATER, "r") as f:
-            elis = [line.strip() for line in f.readlines()]
-    except FileNotFoundError:
-        elis = []
+    queue = get_retry_queue()
+    queue.import_legacy_file(ELI_FOR_LATER)
 
+    elis = queue.due(RETRY_BATCH_SIZE)
     if not elis:
         print("No ELI to check later.")
         return
 
-    print(f"🔔 Found {len(elis)} ELI to check voting details later!")
-
-    remaining_eli = []
+    print(f"🔔 Found {len(elis)} ELI to check later!")
 
     for eli in elis:
-        if check_voting_details(eli):
-            act_details = fetch_one_law(eli)
-            if act_details:
-                pdf_url = f"{BASIC_URL}{eli}/text.pdf"
-                pdf_text = pdf_to_text(pdf_url)
-                if pdf_text:
-                    process_and_save_act(act_details, pdf_text)
-                else:
-                    print(f"❌ Failed to fetch PDF text for act: {act_details.get('title')}")
-                    remaining_eli.append(eli)
-            else:
-                print(f"❌ Could not fetch details for act {eli}")
-                remaining_eli.append(eli)
+        # Queued laws wait for their votes; other acts only failed processing.
+        act_details = fetch_one_law(eli)
+        if not act_details:
+            print(f"❌ Could not fetch details for act {eli}")
+            error = "No act details"
+        elif act_details.get("type") == "Ustawa" and not check_voting_details(eli):
+            error = "No voting details"
         else:
-            remaining_eli.append(eli)
-
-    if remaining_eli:
-        with open(ELI_FOR_LATER, "w") as f:
-            for eli in remaining_eli:
-                f.write(f"{eli}\n")
-    else:
-        os.remove(ELI_FOR_LATER)
-        print("All ELI processed successfully, removed the file.")
+            pdf_url = f"{BASIC_URL}{eli}/text.pdf"
+            pdf_text = get_checkpoints().load(eli).get(TEXT) or pdf_to_text(pdf_url)
+            if not pdf_text:
+                print(f"❌ Failed to fetch PDF text for act: {act_details.get('title')}")
+                error = "No PDF text"
+            elif process_and_save_act(act_details, pdf_text):
+                queue.complete(eli)
+                continue
+            else:
+                error = "Processing failed"
+
+        if queue.fail(eli, error) == DEAD:
+            print(f"☠️ Giving up on {eli} after repeated failures: {error}")
+
+    counts = queue.counts()
+    print(f"Retry queue: {counts[PENDING]} pending, {counts[DEAD]} dead.")
+
+# Cache hit ratios and pool usage for the whole run, then the Prometheus text file.
+def export_run_metrics() -> None:
+    if LLM_CACHE_ENABLED:
+        metrics.set_gauge("cache_hit_ratio", get_llm_cache().stats()["hitRate"], cache="llm")
+    http_stats = get_http_cache().stats()
+    lookups = sum(http_stats.values())
+    if lookups:
+        metrics.set_gauge("cache_hit_ratio", round((http_stats["hits"] + http_stats["revalidated"]) / lookups, 3), cache="http")
+    metrics.set_gauge("db_pool_max_in_use", get_pool_metrics()["maxInUse"])
+    metrics.export()
+
+# One run: new acts, then the retry queue. Act details and votings fetched by either step are shared within the run.
+def run() -> int:
+    metrics.start_run()
+    with run_scope() as memo:
+        new_acts = check_for_new_acts()
+        check_old_eli()
+    stats = memo.stats()
+    print(f"🗄️ Run memo: {stats['hits']} hits, {stats['misses']} misses")
+    metrics.set_gauge("run_memo_hits", stats["hits"])
+    metrics.set_gauge("run_memo_misses", stats["misses"])
+    export_run_metrics()
+    return new_acts
 
 if __name__ == "__main__":
-    check_for_new_acts()
-    check_old_eli()
\ No newline at end of file
+    configure_logging()
+    run()
\ No newline at end of file
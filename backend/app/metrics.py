@@ -0,0 +1,160 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import METRICS_ENABLED, METRICS_EVENTS_FILE, METRICS_PROM_FILE
+
+# Structured run metrics. Every observation is appended to METRICS_EVENTS_FILE
+# as one JSON line, tagged with the ELI of the act being processed, and
+# aggregated in memory. export() writes the aggregates in the Prometheus text
+# format to METRICS_PROM_FILE (for the node_exporter textfile collector).
+# start_run() rotates the events file, so it holds one run and the previous
+# run's events are kept next to it with a ".1" suffix.
+#
+# Counters only grow, summaries keep count/sum/max of observed values (e.g.
+# seconds, bytes, tokens), gauges hold the last value set.
+
+current_act: ContextVar[Optional[str]] = ContextVar("current_act", default=None)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: Dict[str, Any]) -> Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + "}"
+
+class Metrics:
+    def __init__(self, events_path: Optional[Path] = None):
+        self._lock = threading.Lock()
+        self._events_path = events_path
+        self._events_file = None
+        self.counters: Dict[Key, float] = {}
+        self.summaries: Dict[Key, List[float]] = {}
+        self.gauges: Dict[Key, float] = {}
+
+    def _write_event(self, kind: str, name: str, value: float, labels: Dict[str, Any]) -> None:
+        if self._events_path is None:
+            return
+        event = {"ts": round(time.time(), 3), "type": kind, "name": name, "value": value}
+        if labels:
+            event["labels"] = labels
+        eli = current_act.get()
+        if eli:
+            event["eli"] = eli
+        if self._events_file is None:
+            self._events_file = open(self._events_path, "a", encoding="utf-8")
+        self._events_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def rotate_events(self) -> None:
+        if self._events_path is None:
+            return
+        with self._lock:
+            if self._events_file is not None:
+                self._events_file.close()
+                self._events_file = None
+            if self._events_path.exists():
+                self._events_path.replace(self._events_path.with_name(self._events_path.name + ".1"))
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self._write_event("counter", name, value, labels)
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            summary = self.summaries.setdefault(key, [0, 0.0, value])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+            self._write_event("summary", name, value, labels)
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+            self._write_event("gauge", name, value, labels)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        typed = set()
+
+        def _type(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                _type(name, "counter")
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for (name, labels), (count, total, _) in sorted(self.summaries.items()):
+                _type(name, "summary")
+                lines.append(f"{name}_count{_format_labels(labels)} {count:g}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+            for (name, labels), (_, _, maximum) in sorted(self.summaries.items()):
+                _type(f"{name}_max", "gauge")
+                lines.append(f"{name}_max{_format_labels(labels)} {maximum:g}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                _type(name, "gauge")
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path) -> None:
+        with self._lock:
+            if self._events_file is not None:
+                self._events_file.flush()
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(self.to_prometheus(), encoding="utf-8")
+        tmp_path.replace(path)
+
+_metrics = Metrics(METRICS_EVENTS_FILE if METRICS_ENABLED else None)
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    if METRICS_ENABLED:
+        _metrics.inc(name, value, **labels)
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    if METRICS_ENABLED:
+        _metrics.observe(name, value, **labels)
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    if METRICS_ENABLED:
+        _metrics.set_gauge(name, value, **labels)
+
+@contextmanager
+def timer(name: str, **labels: Any) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+# Tags every metric recorded inside the block (on this thread, or in
+# contexts copied from it) with the act's ELI.
+@contextmanager
+def act_scope(eli: Optional[str]) -> Iterator[None]:
+    token = current_act.set(eli)
+    try:
+        yield
+    finally:
+        current_act.reset(token)
+
+def start_run() -> None:
+    if METRICS_ENABLED:
+        _metrics.rotate_events()
+
+def export(path: Path = METRICS_PROM_FILE) -> None:
+    if METRICS_ENABLED:
+        _metrics.export(path)
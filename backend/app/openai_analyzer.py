@@ -2,54 +2,107 @@ import os
 import json
 import time
 import logging
-from typing import Dict, Any, List, Optional, Union
-from database import create_new_category, extend_category_keywords
-from openai import OpenAI, APIError
+import threading
+import functools
+import contextvars
+from typing import TYPE_CHECKING, Dict, Any, Callable, Iterable, List, Optional, Union
+from category_index import parse_keywords
 from dotenv import load_dotenv
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from contextlib import contextmanager
-
-logging.basicConfig(
-    filename='app.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import get_openai_rate_limiter, estimate_tokens
+from llm_cache import get_llm_cache
+from chunking import iter_chunks, chunk_stats
+import metrics
+from config import (
+    SUMMARY_CONCURRENCY,
+    OPENAI_MODEL,
+    OPENAI_CONTEXT_TOKENS,
+    OPENAI_PRICES,
+    OPENAI_BATCH_PRICE_FACTOR,
+    LLM_CACHE_ENABLED,
+    CHUNK_TARGET_TOKENS,
+    REDUCE_FAN_IN,
+    REDUCE_MAX_INPUT_TOKENS,
+    REDUCE_MAX_TOKENS,
 )
 
+# openai and tenacity take most of the startup time, so they are
+# imported on first use: a run that finds nothing new never loads them.
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+
+# One client (and its connection pool) for all threads and runs of the process.
 @contextmanager
 def get_openai_client():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OpenAI API key missing.")
-    
-    client = OpenAI(api_key=api_key)
-    try:
-        yield client
-    finally:
-        client.close()
-
-@retry(
-    stop=stop_after_attempt(5), 
-    wait=wait_exponential(multiplier=1, min=4, max=60), 
-    retry=retry_if_exception_type(APIError)
-)
-def analyze_text_with_openai(text: str, prompt: str, max_tokens: int = 1000) -> Union[Dict[str, Any], str]:
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OpenAI API key missing.")
+            from openai import OpenAI
+            _client = OpenAI(api_key=api_key)
+        client = _client
+    yield client
+
+def close_openai_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+@functools.lru_cache(maxsize=None)
+def _retrying_completion() -> Callable[[str, str, int], Union[Dict[str, Any], str]]:
+    from openai import APIError
+    from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+    return retry(
+        stop=stop_after_attempt(5), 
+        wait=wait_exponential(multiplier=1, min=4, max=60), 
+        retry=retry_if_exception_type(APIError)
+    )(_attempt_completion)
+
+# Spend in USD from the per-model prices in config; models without a price are not counted.
+def record_openai_cost(prompt_tokens: int, completion_tokens: int, batch: bool = False) -> None:
+    prices = OPENAI_PRICES.get(OPENAI_MODEL)
+    if not prices:
+        return
+    cost = (prompt_tokens * prices["in"] + completion_tokens * prices["out"]) / 1_000_000
+    if batch:
+        cost *= OPENAI_BATCH_PRICE_FACTOR
+    metrics.inc("openai_cost_usd_total", cost, model=OPENAI_MODEL, api="batch" if batch else "chat")
+
+def _request_completion(text: str, prompt: str, max_tokens: int) -> Union[Dict[str, Any], str]:
+    return _retrying_completion()(text, prompt, max_tokens)
+
+def _attempt_completion(text: str, prompt: str, max_tokens: int) -> Union[Dict[str, Any], str]:
+    from openai import APIError
     logger.info(f"Processing text, length: {len(text)} characters")
+    # Acquired per attempt, so tenacity retries also respect the rate limit.
+    get_openai_rate_limiter().acquire(estimate_tokens(prompt + text) + max_tokens)
     
     try:
-        with get_openai_client() as client:
+        with get_openai_client() as client, metrics.timer("openai_request_seconds", model=OPENAI_MODEL):
             response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": prompt}, 
                     {"role": "user", "content": text}
                 ],
                 max_tokens=max_tokens
             )
+            if response.usage:
+                metrics.inc("openai_tokens_total", response.usage.prompt_tokens, model=OPENAI_MODEL, direction="in")
+                metrics.inc("openai_tokens_total", response.usage.completion_tokens, model=OPENAI_MODEL, direction="out")
+                record_openai_cost(response.usage.prompt_tokens, response.usage.completion_tokens)
             content = response.choices[0].message.content
             
             if "json" in prompt.lower():
@@ -61,30 +114,124 @@ def analyze_text_with_openai(text: str, prompt: str, max_tokens: int = 1000) ->
             return content
     except APIError as e:
         logger.error(f"API error: {e}")
+        metrics.inc("openai_errors_total", model=OPENAI_MODEL)
         raise
     
     time.sleep(1.0)
 
+# Input over the context window would be cut or rejected by the API; it is
+# cut here instead, with a warning, before the request is made.
+def fit_to_context(text: str, prompt: str, max_tokens: int) -> str:
+    budget = OPENAI_CONTEXT_TOKENS - max_tokens - estimate_tokens(prompt)
+    if estimate_tokens(text) <= budget:
+        return text
+    logger.warning(f"Input of ~{estimate_tokens(text)} tokens exceeds the budget of {budget} tokens, truncating")
+    metrics.inc("openai_truncated_total", model=OPENAI_MODEL)
+    return text[:max(budget, 0) * 4]
+
+def analyze_text_with_openai(text: str, prompt: str, max_tokens: int = 1000) -> Union[Dict[str, Any], str]:
+    text = fit_to_context(text, prompt, max_tokens)
+    if not LLM_CACHE_ENABLED:
+        return _request_completion(text, prompt, max_tokens)
+
+    cache = get_llm_cache()
+    key = cache.make_key(OPENAI_MODEL, prompt, text, max_tokens)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"LLM cache hit, length: {len(text)} characters")
+        metrics.inc("llm_cache_requests_total", result="hit")
+        return cached
+
+    metrics.inc("llm_cache_requests_total", result="miss")
+    result = _request_completion(text, prompt, max_tokens)
+    if not (isinstance(result, dict) and "error" in result):
+        cache.set(key, result)
+    return result
+
+FRAGMENT_PROMPT = "Podsumuj ten fragment dokumentu prawnego w języku polskim w 2-3 zwięzłych zdaniach, wychwytując kluczowe zmiany lub przepisy. Skup się na istocie, unikając zbędnych szczegółów."
+
+FRAGMENT_MAX_TOKENS = 200
+
 def summarize_fragment(text: str) -> str:
-    prompt = "Podsumuj ten fragment dokumentu prawnego w języku polskim w 2-3 zwięzłych zdaniach, wychwytując kluczowe zmiany lub przepisy. Skup się na istocie, unikając zbędnych szczegółów."
-    return analyze_text_with_openai(text, prompt, max_tokens=200)
-
-def split_and_analyze_text(text: str, chunk_size: int = 3000, chunk_overlap: int = 200) -> Dict[str, Any]:
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, 
-        chunk_overlap=chunk_overlap, 
-        length_function=len
+    return analyze_text_with_openai(text, FRAGMENT_PROMPT, max_tokens=FRAGMENT_MAX_TOKENS)
+
+def _map_in_threads(function: Callable[[int, Any], str], items: Iterable[Any], max_workers: Optional[int], name: str) -> List[str]:
+    max_workers = max_workers or SUMMARY_CONCURRENCY
+    if max_workers <= 1:
+        return [function(i, item) for i, item in enumerate(items)]
+
+    # Items are submitted as soon as they are produced; results are collected
+    # in submission order, whatever order the requests finish in.
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name) as executor:
+        # Each task runs in a copy of the caller's context, so its metrics keep the act's ELI.
+        futures = [executor.submit(contextvars.copy_context().run, function, i, item) for i, item in enumerate(items)]
+        return [future.result() for future in futures]
+
+def summarize_chunks(chunks: Iterable[str], max_workers: Optional[int] = None) -> List[str]:
+    def _summarize(i: int, chunk: str) -> str:
+        logger.info(f"Summarizing chunk {i+1}")
+        return summarize_fragment(chunk)
+
+    return _map_in_threads(_summarize, chunks, max_workers, "summarize")
+
+# Chunks are submitted as iter_chunks produces them, so with an iterable of
+# pages the first summaries are requested before the last page is read.
+def summarize_text(text: Union[str, Iterable[str]], target_tokens: int = CHUNK_TARGET_TOKENS, max_workers: Optional[int] = None) -> List[str]:
+    counters: Dict[str, int] = {}
+    summaries = summarize_chunks(iter_chunks(text, target_tokens, counters), max_workers=max_workers)
+    stats = chunk_stats(counters, request_tokens=estimate_tokens(FRAGMENT_PROMPT))
+    logger.info(
+        f"Split into {stats['chunks']} chunks, ~{stats['tokens']} tokens "
+        f"(character splitter: {stats['baselineChunks']} chunks, ~{stats['baselineTokens']} tokens; "
+        f"saved ~{stats['savedTokens']} tokens, {stats['boilerplateTokens']} of them headers/footers)"
     )
-    chunks = text_splitter.split_text(text)
-    logger.info(f"Split into {len(chunks)} chunks")
+    metrics.observe("act_chunks", stats["chunks"])
+    metrics.observe("chunk_tokens", stats["tokens"])
+    metrics.inc("chunk_tokens_saved_total", stats["savedTokens"])
+    metrics.inc("chunk_requests_saved_total", stats["savedRequests"])
+    return summaries
+
+REDUCE_PROMPT = "Połącz poniższe streszczenia kolejnych fragmentów dokumentu prawnego w jedno zwięzłe streszczenie w języku polskim (4-6 zdań), zachowując kluczowe zmiany i przepisy. Nie dodawaj informacji, których nie ma w streszczeniach."
 
-    summaries = []
-    for i, chunk in enumerate(chunks):
-        logger.info(f"Summarizing chunk {i+1}/{len(chunks)}")
-        summary = summarize_fragment(chunk)
-        summaries.append(summary)
+def group_summaries(summaries: List[str], fan_in: int, max_input_tokens: int) -> List[List[str]]:
+    groups: List[List[str]] = []
+    current: List[str] = []
+    tokens = 0
+    for summary in summaries:
+        summary_tokens = estimate_tokens(summary) + 1
+        if current and (len(current) >= fan_in or tokens + summary_tokens > max_input_tokens):
+            groups.append(current)
+            current, tokens = [], 0
+        current.append(summary)
+        tokens += summary_tokens
+    if current:
+        groups.append(current)
+    return groups
 
-    combined_summary = "\n".join(summaries)
+# Summaries of long acts (codes, budgets: hundreds of chunks) do not fit one
+# analysis call. Neighbouring summaries are merged, at most fan_in and
+# max_input_tokens per call and all calls of a level in parallel, level after
+# level until the rest fits the final call, so depth grows with log(chunks).
+def reduce_summaries(summaries: List[str], fan_in: int = REDUCE_FAN_IN, max_input_tokens: int = REDUCE_MAX_INPUT_TOKENS, max_workers: Optional[int] = None) -> List[str]:
+    def _merge(i: int, group: List[str]) -> str:
+        return analyze_text_with_openai("\n".join(group), REDUCE_PROMPT, max_tokens=REDUCE_MAX_TOKENS)
+
+    fan_in = max(fan_in, 2)
+    level = 0
+    while len(summaries) > fan_in or estimate_tokens("\n".join(summaries)) > max_input_tokens:
+        groups = group_summaries(summaries, fan_in, max_input_tokens)
+        # Only summaries over the budget on their own are left, fit_to_context cuts them.
+        if len(groups) >= len(summaries):
+            break
+        level += 1
+        logger.info(f"Reduce level {level}: {len(summaries)} summaries in {len(groups)} calls")
+        summaries = _map_in_threads(_merge, groups, max_workers, "reduce")
+
+    metrics.observe("reduce_levels", level)
+    return summaries
+
+def analyze_summaries(summaries: List[str], max_workers: Optional[int] = None) -> Union[Dict[str, Any], str]:
+    combined_summary = "\n".join(reduce_summaries(summaries, max_workers=max_workers))
     logger.info(f"Summaries combined, length: {len(combined_summary)} characters")
 
     analysis_prompt = (
@@ -107,7 +254,9 @@ def save_analysis_to_file(analysis: Union[Dict[str, Any], str], filename: str) -
     except Exception as e:
         logger.error(f"Save error: {e}")
 
-def find_or_create_category_with_ai(act_keywords: List[str], all_categories: List[Dict[str, Any]], act_title: str = "", act_content: str = "") -> Optional[str]:
+# Returns the AI's decision ({"action", "category", "keywords"}) without
+# touching the database; database.apply_category_decision writes it.
+def find_or_create_category_with_ai(act_keywords: List[str], all_categories: List[Dict[str, Any]], act_title: str = "", act_content: str = "") -> Optional[Dict[str, Any]]:
 
     if not act_keywords or not all_categories:
         return None
@@ -115,17 +264,7 @@ def find_or_create_category_with_ai(act_keywords: List[str], all_categories: Lis
     categories_info = []
     for category_data in all_categories:
         category_name = category_data.get("category")
-        category_keywords = category_data.get("keywords", [])
-        
-        if isinstance(category_keywords, str):
-            try:
-                keywords_list = json.loads(category_keywords)
-            except json.JSONDecodeError:
-                keywords_list = [category_keywords]
-        elif isinstance(category_keywords, list):
-            keywords_list = category_keywords
-        else:
-            keywords_list = []
+        keywords_list = parse_keywords(category_data.get("keywords", []))
             
         categories_info.append({
             "category": category_name,
@@ -179,16 +318,20 @@ def find_or_create_category_with_ai(act_keywords: List[str], all_categories: Lis
             
             if action == "match":
                 if any(cat.get("category") == category_name for cat in all_categories):
-                    return category_name
+                    return {"action": "match", "category": category_name}
                 else:
                     logger.warning(f"AI suggested non-existent category: {category_name}")
                     return None
                     
             elif action == "extend":
-                return extend_category_keywords(category_name, new_keywords, all_categories)
+                if any(cat.get("category") == category_name for cat in all_categories):
+                    return {"action": "extend", "category": category_name, "keywords": new_keywords}
+                else:
+                    logger.warning(f"AI suggested extending non-existent category: {category_name}")
+                    return None
                 
             elif action == "create":
-                return create_new_category(category_name, new_keywords + act_keywords)
+                return {"action": "create", "category": category_name, "keywords": new_keywords + act_keywords}
                 
         else:
             logger.error(f"Invalid AI response format: {ai_decision}")
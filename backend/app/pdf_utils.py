@@ -1,49 +1,129 @@
 import os
+import tempfile
 import requests
-import fitz
-from typing import Optional
-from config import PDF_DOWNLOAD_TIMEOUT
+import http_client
+import metrics
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from config import PDF_DOWNLOAD_TIMEOUT, PDF_MAX_BYTES, PDF_PAGES_PER_SHARD, PDF_PAGE_BREAK
 
-def download_pdf(url: str, filename: str = "temp.pdf") -> Optional[str]:
+# PDFs are kept in memory end to end: no shared temp files, so concurrent
+# runs and pipeline workers never step on each other.
+def download_pdf(url: str, max_bytes: int = PDF_MAX_BYTES) -> Optional[bytes]:
     try:
-        response = requests.get(url, timeout=PDF_DOWNLOAD_TIMEOUT, stream=True)
-        response.raise_for_status()
-        
-        if not response.content:
+        with http_client.stream(url, timeout=PDF_DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+
+            try:
+                declared_size = int(response.headers.get("Content-Length") or 0)
+            except ValueError:
+                # A malformed header is no reason to drop the PDF, the streamed size is still checked.
+                declared_size = 0
+            if declared_size > max_bytes:
+                print(f"Warning: PDF of {url} is too large ({declared_size} bytes), skipping")
+                return None
+
+            data = bytearray()
+            for chunk in response.iter_content(chunk_size=65536):
+                data.extend(chunk)
+                if len(data) > max_bytes:
+                    print(f"Warning: PDF of {url} exceeds {max_bytes} bytes, skipping")
+                    return None
+
+        if not data:
             print(f"Warning: Empty PDF of {url}")
             return None
-            
-        with open(filename, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-        return filename
+        metrics.observe("pdf_download_bytes", len(data))
+        return bytes(data)
     except requests.exceptions.RequestException as e:
         print(f"Error while downloading PDF: {e}")
         return None
 
-def pdf_to_text(url: str) -> str:
-    temp_file = None
-    text = ""
+# PyMuPDF is imported with the first PDF, runs that find nothing new never load it.
+def open_pdf(source: Union[bytes, str]):
+    import fitz
+    if isinstance(source, str):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+def iter_pdf_pages(data: bytes) -> Iterator[str]:
+    doc = open_pdf(data)
     try:
-        temp_file = download_pdf(url)
-        if not temp_file or not os.path.exists(temp_file):
-            print(f"Error: PDF file not downloaded correctly from {url}")
-            return text
-            
-        doc = fitz.open(temp_file)
         for page in doc:
-            text += page.get_text()
+            yield page.get_text()
+    finally:
         doc.close()
-    except Exception as e:
-        print(f"Error while processing PDF: {e}")
+
+def extract_pdf_text(data: bytes) -> str:
+    with metrics.timer("pdf_extract_seconds"):
+        pages = list(iter_pdf_pages(data))
+    metrics.observe("pdf_bytes", len(data))
+    metrics.observe("pdf_pages", len(pages))
+    return PDF_PAGE_BREAK.join(pages)
+
+def extract_page_range(path: str, start: int, end: int) -> str:
+    doc = open_pdf(path)
+    try:
+        return PDF_PAGE_BREAK.join(doc[i].get_text() for i in range(start, min(end, doc.page_count)))
+    finally:
+        doc.close()
+
+def count_pdf_pages(data: bytes) -> int:
+    doc = open_pdf(data)
+    try:
+        return doc.page_count
     finally:
-        if temp_file and os.path.exists(temp_file):
+        doc.close()
+
+# CPU-bound extraction for backfills: documents are cut into page-range shards
+# and spread over a process pool, then reassembled in page order. Each PDF is
+# written once to a private temp directory and the workers get its path, so
+# a shard does not pickle the whole document over to the worker.
+def extract_texts_in_processes(pdfs: Dict[str, bytes], max_workers: Optional[int] = None, pages_per_shard: int = PDF_PAGES_PER_SHARD) -> Dict[str, str]:
+    with tempfile.TemporaryDirectory(prefix="pdf-shards-") as tmp:
+        paths: Dict[str, str] = {}
+        shards: List[Tuple[str, int, int]] = []
+        for i, (key, data) in enumerate(pdfs.items()):
+            try:
+                page_count = count_pdf_pages(data)
+            except Exception as e:
+                print(f"Error while processing PDF {key}: {e}")
+                continue
+            path = Path(tmp) / f"{i}.pdf"
+            path.write_bytes(data)
+            paths[key] = str(path)
+            for start in range(0, page_count, pages_per_shard):
+                shards.append((key, start, start + pages_per_shard))
+
+        return _extract_shards(paths, shards, max_workers)
+
+def _extract_shards(paths: Dict[str, str], shards: List[Tuple[str, int, int]], max_workers: Optional[int]) -> Dict[str, str]:
+    parts: Dict[str, List[str]] = {key: [] for key, _, _ in shards}
+    failed = set()
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = [executor.submit(extract_page_range, paths[key], start, end) for key, start, end in shards]
+        for (key, _, _), future in zip(shards, futures):
             try:
-                os.remove(temp_file)
-            except OSError as e:
-                print(f"Warning: Unable to remove temporary file: {e}")
-    return text
+                parts[key].append(future.result())
+            except Exception as e:
+                print(f"Error while processing PDF {key}: {e}")
+                failed.add(key)
+
+    return {key: PDF_PAGE_BREAK.join(texts) for key, texts in parts.items() if key not in failed}
+
+def iter_pdf_text(url: str) -> Iterator[str]:
+    data = download_pdf(url)
+    if not data:
+        print(f"Error: PDF file not downloaded correctly from {url}")
+        return
+    try:
+        yield from iter_pdf_pages(data)
+    except Exception as e:
+        print(f"Error while processing PDF: {e}")
+
+def pdf_to_text(url: str) -> str:
+    return PDF_PAGE_BREAK.join(iter_pdf_text(url))
 
 def save_text_to_file(text: str, filename: str) -> bool:
     try:
@@ -53,4 +133,4 @@ def save_text_to_file(text: str, filename: str) -> bool:
         return True
     except Exception as e:
         print(f"❌ Error while saving to file: {e}")
-        return False
\ No newline at end of file
+        return False
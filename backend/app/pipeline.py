@@ -0,0 +1,263 @@
+import json
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Callable, Tuple, Union
+
+from openai_analyzer import summarize_text, analyze_summaries, save_analysis_to_file
+from pdf_utils import download_pdf, extract_pdf_text, iter_pdf_pages, save_text_to_file
+from storage import load_extracted_text
+from checkpoints import get_checkpoints, TEXT, DETAILS, VOTES, CHUNK_SUMMARIES, ANALYSIS
+from api import fetch_one_law, get_voting_details
+from database import decide_category, upsert_acts
+import metrics
+from config import (
+    BASIC_URL,
+    PDF_PAGE_BREAK,
+    ACT_CONTENT_FILE,
+    ACT_ANALYSIS_FILE,
+    PIPELINE_FETCH_WORKERS,
+    PIPELINE_EXTRACT_MAP_WORKERS,
+    PIPELINE_REDUCE_WORKERS,
+    PIPELINE_CATEGORIZE_WORKERS,
+    PIPELINE_PERSIST_BATCH_SIZE,
+)
+
+# Acts flow through fetch -> extract -> summarize -> categorize on separate
+# thread pools, so one act can be summarized while the next one is still
+# downloading. Every stage takes a job dict and returns it (or None to drop
+# the act). Persisting happens on the calling thread, in batches, in the
+# order the acts were passed in.
+#
+# Each finished stage is checkpointed per act (see checkpoints.py), so an act
+# that failed late resumes where it stopped on the next run.
+#
+# A freshly downloaded PDF is not extracted in one go: its pages are chunked
+# and summarized as PyMuPDF produces them, so the first chunk summaries are
+# requested while the rest of the document is still being parsed. So the
+# extract stage is extract + map (PIPELINE_EXTRACT_MAP_WORKERS) and the
+# summarize stage only has the reduce and the analysis left
+# (PIPELINE_REDUCE_WORKERS). Acts with text from a checkpoint or a backfill
+# run are mapped in the summarize stage.
+
+Job = Dict[str, Any]
+
+def build_filtered_item(eli: str, act_details: Dict[str, Any], analysis: Dict[str, Any], voting_details: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    act_number = eli.split("/")[-1] if eli else None
+    return {
+        "eli": eli,
+        "title": act_details.get("title"),
+        "actNumber": act_number,
+        "simpleTitle": analysis.get("title"),
+        "content": analysis.get("content_html"),
+        "references": act_details.get("references"),
+        "texts": act_details.get("texts"),
+        "type": act_details.get("type"),
+        "announcementDate": act_details.get("announcementDate"),
+        "changeDate": act_details.get("changeDate"),
+        "promulgation": act_details.get("promulgation"),
+        "status": act_details.get("status"),
+        "comments": act_details.get("comments"),
+        "keywords": act_details.get("keywords"),
+        "file": f"{BASIC_URL}{eli}/text.pdf",
+        "votes": voting_details
+    }
+
+def load_act_details(eli: str, saved: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if saved.get(DETAILS):
+        return saved[DETAILS]
+    act_details = fetch_one_law(eli)
+    if act_details:
+        get_checkpoints().save(eli, DETAILS, act_details)
+    return act_details
+
+def load_voting_details(eli: str, act_details: Dict[str, Any], saved: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if saved.get(VOTES):
+        return saved[VOTES]
+    # Missing votes are not checkpointed, they may be published later. An
+    # empty result (no votes counted) is not a result either.
+    voting_details = get_voting_details(act_details)
+    if voting_details and voting_details.get("summary", {}).get("total", 0) > 0:
+        get_checkpoints().save(eli, VOTES, voting_details)
+    return voting_details
+
+def analyze_act(eli: str, text: str, saved: Dict[str, Any]) -> Union[Dict[str, Any], str]:
+    if saved.get(ANALYSIS):
+        return saved[ANALYSIS]
+
+    checkpoints = get_checkpoints()
+    summaries = saved.get(CHUNK_SUMMARIES)
+    if summaries is None:
+        summaries = summarize_text(text)
+        checkpoints.save(eli, CHUNK_SUMMARIES, summaries)
+
+    analysis = analyze_summaries(summaries)
+    if not (isinstance(analysis, dict) and "error" in analysis):
+        checkpoints.save(eli, ANALYSIS, analysis)
+    return analysis
+
+def fetch_stage(job: Job) -> Optional[Job]:
+    eli = job["eli"]
+    saved = get_checkpoints().load(eli)
+    job["saved"] = saved
+
+    act_details = load_act_details(eli, saved)
+    if not act_details:
+        print(f"Error: Could not fetch details for act {eli}")
+        return None
+
+    # Text from an earlier attempt or from a backfill run (backfill.py)
+    # replaces the PDF download.
+    text = saved.get(TEXT) or load_extracted_text(eli)
+    if text:
+        job["text"] = text
+    else:
+        pdf = download_pdf(f"{BASIC_URL}{eli}/text.pdf")
+        if not pdf:
+            print(f"❌ Failed to fetch PDF text for act: {job['title']}")
+            return None
+        job["pdf"] = pdf
+
+    job["details"] = act_details
+    job["votes"] = load_voting_details(eli, act_details, saved)
+    return job
+
+# pdf_extract_seconds only counts PyMuPDF, not the chunking and submitting
+# the consumer does between two pages.
+def _stream_pages(pdf: bytes, pages: List[str]) -> Iterator[str]:
+    extracting = 0.0
+    doc_pages = iter_pdf_pages(pdf)
+    while True:
+        started = time.perf_counter()
+        page = next(doc_pages, None)
+        extracting += time.perf_counter() - started
+        if page is None:
+            break
+        pages.append(page)
+        yield page
+    metrics.observe("pdf_extract_seconds", extracting)
+    metrics.observe("pdf_bytes", len(pdf))
+    metrics.observe("pdf_pages", len(pages))
+
+def extract_stage(job: Job) -> Optional[Job]:
+    if "pdf" in job:
+        pdf = job.pop("pdf")
+        saved = job["saved"]
+        checkpoints = get_checkpoints()
+        if saved.get(CHUNK_SUMMARIES) is None and saved.get(ANALYSIS) is None:
+            pages: List[str] = []
+            summaries = summarize_text(_stream_pages(pdf, pages))
+            job["text"] = PDF_PAGE_BREAK.join(pages)
+            if job["text"]:
+                checkpoints.save(job["eli"], TEXT, job["text"])
+                checkpoints.save(job["eli"], CHUNK_SUMMARIES, summaries)
+                saved[CHUNK_SUMMARIES] = summaries
+        else:
+            job["text"] = extract_pdf_text(pdf)
+            if job["text"]:
+                checkpoints.save(job["eli"], TEXT, job["text"])
+
+    if not job["text"]:
+        print(f"❌ Failed to fetch PDF text for act: {job['title']}")
+        return None
+    return job
+
+def summarize_stage(job: Job) -> Optional[Job]:
+    analysis = analyze_act(job["eli"], job["text"], job["saved"])
+    job["analysis"] = analysis
+    analysis_dict = analysis if isinstance(analysis, dict) else json.loads(analysis)
+    job["item"] = build_filtered_item(job["eli"], job["details"], analysis_dict, job["votes"])
+    return job
+
+# Only decides the category; persist_jobs applies it together with the upsert.
+def categorize_stage(job: Job) -> Optional[Job]:
+    job["category"] = decide_category(job["item"])
+    return job
+
+def persist_jobs(jobs: List[Job]) -> bool:
+    if not jobs:
+        return True
+    save_text_to_file(jobs[-1]["text"], str(ACT_CONTENT_FILE))
+    save_analysis_to_file(jobs[-1]["analysis"], str(ACT_ANALYSIS_FILE))
+    success = upsert_acts([job["item"] for job in jobs], [job["category"] for job in jobs])
+    if success:
+        checkpoints = get_checkpoints()
+        for job in jobs:
+            checkpoints.clear(job["eli"])
+    return success
+
+def _run_stage(stage: Callable[[Job], Optional[Job]], job: Job) -> Optional[Job]:
+    with metrics.act_scope(job["eli"]):
+        try:
+            with metrics.timer("pipeline_stage_seconds", stage=stage.__name__):
+                return stage(job)
+        except Exception as e:
+            print(f"❌ Stage {stage.__name__} failed for act {job['eli']}: {e}")
+            metrics.inc("pipeline_stage_errors_total", stage=stage.__name__)
+            return None
+
+def _chain(upstream: Future, executor: ThreadPoolExecutor, stage: Callable[[Job], Optional[Job]]) -> Future:
+    downstream: Future = Future()
+
+    def _forward(inner: Future) -> None:
+        downstream.set_result(inner.result())
+
+    def _schedule(done: Future) -> None:
+        job = done.result()
+        if job is None:
+            downstream.set_result(None)
+            return
+        executor.submit(_run_stage, stage, job).add_done_callback(_forward)
+
+    upstream.add_done_callback(_schedule)
+    return downstream
+
+def run_pipeline(acts: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], bool]]:
+    stages = [
+        (fetch_stage, PIPELINE_FETCH_WORKERS),
+        (extract_stage, PIPELINE_EXTRACT_MAP_WORKERS),
+        (summarize_stage, PIPELINE_REDUCE_WORKERS),
+        (categorize_stage, PIPELINE_CATEGORIZE_WORKERS),
+    ]
+    executors = [
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix=stage.__name__)
+        for stage, workers in stages
+    ]
+
+    results = []
+    try:
+        futures = []
+        for act in acts:
+            print(f"➡️ Processing act: {act.get('title', 'unknown')}")
+            job = {"act": act, "eli": act.get("ELI"), "title": act.get("title", "unknown")}
+            future = executors[0].submit(_run_stage, stages[0][0], job)
+            for (stage, _), executor in zip(stages[1:], executors[1:]):
+                future = _chain(future, executor, stage)
+            futures.append(future)
+
+        # Finished acts are written in batches, one upsert per batch, still
+        # in the order the acts were passed in.
+        batch = []
+        for i, (act, future) in enumerate(zip(acts, futures)):
+            job = future.result()
+            if job:
+                batch.append(job)
+            else:
+                print(f"❌ Error processing act: {act.get('title')}")
+                results.append((act, False))
+                metrics.inc("pipeline_acts_total", result="failed")
+
+            if batch and (len(batch) >= PIPELINE_PERSIST_BATCH_SIZE or i == len(acts) - 1):
+                success = persist_jobs(batch)
+                for saved in batch:
+                    if success:
+                        print(f"✅ Act processed successfully: {saved['title']}")
+                    else:
+                        print(f"❌ Error processing act: {saved['title']}")
+                    results.append((saved["act"], success))
+                    metrics.inc("pipeline_acts_total", result="saved" if success else "failed")
+                batch = []
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+
+    return results
@@ -0,0 +1,52 @@
+import time
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+from local_store import open_sqlite
+from config import PROCESSED_ACTS_FILE
+
+# Per-year set of ELIs that no longer need processing (saved, or handed over
+# to the retry queue). New acts are the ones missing from the set, so the
+# result does not depend on the API keeping a single marker act in place or
+# in order, and an interrupted backfill continues where it stopped.
+
+class ProcessedActs:
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed_acts (
+                year INTEGER NOT NULL,
+                eli TEXT NOT NULL,
+                processed_at REAL NOT NULL,
+                PRIMARY KEY (year, eli)
+            )
+        """)
+
+    def elis(self, year: int) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT eli FROM processed_acts WHERE year = ?", (year,)).fetchall()
+        return {row[0] for row in rows}
+
+    def mark(self, year: int, elis: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO processed_acts (year, eli, processed_at) VALUES (?, ?, ?)",
+                [(year, eli, now) for eli in elis]
+            )
+
+    def count(self, year: int) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed_acts WHERE year = ?", (year,)).fetchone()[0]
+
+_store: Optional[ProcessedActs] = None
+_store_lock = threading.Lock()
+
+def get_processed_acts() -> ProcessedActs:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProcessedActs(PROCESSED_ACTS_FILE)
+        return _store
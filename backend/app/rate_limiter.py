@@ -0,0 +1,57 @@
+import threading
+import time
+from typing import Optional
+
+from config import OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE
+
+# Two token buckets (requests and tokens) refilled continuously over a minute.
+# acquire() blocks until both have room, so callers can be retried by tenacity
+# and simply wait for capacity again on the next attempt.
+class RateLimiter:
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0) -> float:
+        tokens = min(max(tokens, 0), self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return waited
+                missing_requests = max(0.0, 1 - self._requests)
+                missing_tokens = max(0.0, tokens - self._tokens)
+                delay = max(
+                    missing_requests * 60 / self.requests_per_minute,
+                    missing_tokens * 60 / self.tokens_per_minute,
+                )
+            time.sleep(delay)
+            waited += delay
+
+_openai_limiter: Optional[RateLimiter] = None
+_openai_limiter_lock = threading.Lock()
+
+def get_openai_rate_limiter() -> RateLimiter:
+    global _openai_limiter
+    with _openai_limiter_lock:
+        if _openai_limiter is None:
+            _openai_limiter = RateLimiter(OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE)
+        return _openai_limiter
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic for Polish legal text: ~4 characters per token.
+    return len(text) // 4 + 1
@@ -0,0 +1,103 @@
+import time
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from local_store import open_sqlite
+from config import RETRY_QUEUE_FILE, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_MAX_ATTEMPTS
+
+# Durable queue of ELIs to retry later: laws whose voting details were not
+# available yet and acts the pipeline failed on (a corrupt PDF, an OpenAI
+# call that keeps failing). Each item has its own next attempt time with exponential
+# backoff; after RETRY_MAX_ATTEMPTS failures it moves to the "dead" state and
+# is no longer drained.
+
+PENDING = "pending"
+DEAD = "dead"
+
+class RetryQueue:
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS retry_queue (
+                eli TEXT PRIMARY KEY,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS retry_queue_due ON retry_queue (state, next_attempt_at)")
+
+    def enqueue(self, eli: str, delay: float = RETRY_BASE_DELAY) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO retry_queue (eli, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (eli, now + delay, now, now)
+            )
+        return cursor.rowcount == 1
+
+    def due(self, limit: int) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT eli FROM retry_queue WHERE state = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (PENDING, time.time(), limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def complete(self, eli: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM retry_queue WHERE eli = ?", (eli,))
+
+    def fail(self, eli: str, error: str = "") -> str:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM retry_queue WHERE eli = ?", (eli,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            state = DEAD if attempts >= RETRY_MAX_ATTEMPTS else PENDING
+            delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+            self._conn.execute("""
+                INSERT INTO retry_queue (eli, state, attempts, next_attempt_at, last_error, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (eli) DO UPDATE SET
+                    state = excluded.state,
+                    attempts = excluded.attempts,
+                    next_attempt_at = excluded.next_attempt_at,
+                    last_error = excluded.last_error,
+                    updated_at = excluded.updated_at
+            """, (eli, state, attempts, now + delay, error, now, now))
+        return state
+
+    def __contains__(self, eli: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM retry_queue WHERE eli = ?", (eli,)).fetchone() is not None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM retry_queue GROUP BY state").fetchall()
+        return {PENDING: 0, DEAD: 0, **dict(rows)}
+
+    # One-off migration of the old one-ELI-per-line text file.
+    def import_legacy_file(self, path: Path) -> int:
+        if not path.exists():
+            return 0
+        with open(path, "r") as f:
+            elis = [line.strip() for line in f if line.strip()]
+        imported = sum(1 for eli in elis if self.enqueue(eli, delay=0))
+        path.unlink()
+        print(f"Imported {imported} ELI from {path} into the retry queue.")
+        return imported
+
+_queue: Optional[RetryQueue] = None
+_queue_lock = threading.Lock()
+
+def get_retry_queue() -> RetryQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = RetryQueue(RETRY_QUEUE_FILE)
+        return _queue
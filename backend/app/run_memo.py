@@ -0,0 +1,78 @@
+import threading
+import functools
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+# Results of idempotent lookups (act details, process data, votings) shared
+# for the duration of one run. Concurrent callers asking for the same key wait
+# for the single call already in flight instead of starting their own.
+#
+# Memoization only happens inside run_scope(), so a long-lived process never
+# serves data older than the current run. None results (failed lookups) are
+# handed to the callers already waiting but not kept, so a later call in the
+# same run tries again. Memoized values are shared, callers must not mutate
+# them.
+
+class RunMemo:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: Dict[Hashable, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_call(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._results[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as e:
+            with self._lock:
+                del self._results[key]
+            future.set_exception(e)
+            raise
+        if result is None:
+            with self._lock:
+                del self._results[key]
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._results)}
+
+_current: Optional[RunMemo] = None
+_current_lock = threading.Lock()
+
+@contextmanager
+def run_scope() -> Iterator[RunMemo]:
+    global _current
+    memo = RunMemo()
+    with _current_lock:
+        previous, _current = _current, memo
+    try:
+        yield memo
+    finally:
+        with _current_lock:
+            _current = previous
+
+def memoized(function: Callable) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        memo = _current
+        if memo is None:
+            return function(*args, **kwargs)
+        key = (function.__module__, function.__name__, args, tuple(sorted(kwargs.items())))
+        return memo.get_or_call(key, lambda: function(*args, **kwargs))
+    return wrapper
@@ -1,7 +1,7 @@
 import json
 from typing import Dict, Any, Optional
 from pathlib import Path
-from config import LAST_KNOWN_FILE
+from config import LAST_KNOWN_FILE, EXTRACTED_TEXT_DIR
 
 def get_last_known() -> Optional[Dict[str, Any]]:
     try:
@@ -20,4 +20,24 @@ def save_last_known(act: Dict[str, Any]) -> bool:
         return True
     except IOError as e:
         print(f"Error while saving to file {LAST_KNOWN_FILE}: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def extracted_text_path(eli: str) -> Path:
+    return EXTRACTED_TEXT_DIR / f"{eli.replace('/', '_')}.txt"
+
+def load_extracted_text(eli: str) -> Optional[str]:
+    path = extracted_text_path(eli)
+    if not path.exists():
+        return None
+    try:
+        return path.read_text(encoding="utf-8")
+    except IOError as e:
+        print(f"Error while reading file {path}: {e}")
+        return None
+
+def save_extracted_text(eli: str, text: str) -> None:
+    path = extracted_text_path(eli)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    tmp_path.replace(path)
@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other by name, as when run from backend/app.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Local state files (metrics.jsonl, the SQLite stores) are relative to the
+# working directory; tests must not write next to the real ones.
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,58 @@
+import pytest
+
+import batch_summaries
+import checkpoints
+import llm_cache
+from chunking import chunk_text
+from checkpoints import get_checkpoints, CHUNK_SUMMARIES
+from llm_cache import get_llm_cache, LLMCache
+from openai_analyzer import FRAGMENT_PROMPT, FRAGMENT_MAX_TOKENS
+from config import OPENAI_MODEL
+
+ELI = "DU/2024/877"
+ACT = {"ELI": ELI, "title": "Ustawa testowa"}
+TEXT = "\n\n".join(f"Art. {i}. " + "Przepis stosuje się odpowiednio do spraw wszczętych. " * 40 for i in range(1, 60))
+
+def failing_submit(path):
+    raise ConnectionError("upload failed")
+
+@pytest.fixture(autouse=True)
+def local_stores(monkeypatch):
+    # The stores open their files in the test's working directory (see conftest.py) on first use.
+    monkeypatch.setattr(batch_summaries, "_store", None)
+    monkeypatch.setattr(checkpoints, "_store", None)
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    monkeypatch.setattr(batch_summaries, "load_act_text", lambda eli: TEXT)
+
+@pytest.fixture
+def chunks():
+    chunks, _ = chunk_text(TEXT)
+    assert len(chunks) > 2
+    # One chunk answered from the cache, so the act has rows before any upload.
+    get_llm_cache().set(LLMCache.make_key(OPENAI_MODEL, FRAGMENT_PROMPT, chunks[0], FRAGMENT_MAX_TOKENS), "cached")
+    return chunks
+
+def test_failed_upload_checkpoints_nothing(chunks, monkeypatch):
+    monkeypatch.setattr(batch_summaries, "submit_job_file", failing_submit)
+
+    with pytest.raises(ConnectionError):
+        batch_summaries.submit_acts([ACT], 2024)
+
+    store = batch_summaries.get_batch_store()
+    assert ELI not in store
+    assert store.answered_acts() == []
+    batch_summaries.poll_batches()
+    assert CHUNK_SUMMARIES not in get_checkpoints().load(ELI)
+
+def test_submit_after_failure_sends_every_uncached_chunk(chunks, monkeypatch):
+    monkeypatch.setattr(batch_summaries, "submit_job_file", failing_submit)
+    with pytest.raises(ConnectionError):
+        batch_summaries.submit_acts([ACT], 2024)
+
+    monkeypatch.setattr(batch_summaries, "submit_job_file", lambda path: ("batch_1", "validating"))
+    assert batch_summaries.submit_acts([ACT], 2024) == len(chunks) - 1
+
+    store = batch_summaries.get_batch_store()
+    assert ELI in store
+    assert store.open_batches() == ["batch_1"]
+    assert store.answered_acts() == []
@@ -0,0 +1,19 @@
+from chunking import iter_clean_pages, chunk_text
+from config import PDF_PAGE_BREAK
+
+def page(number):
+    return f"Dziennik Ustaw – {number} – Poz. 877\nart. {number}a. Przepis na górze strony\nTreść przepisu.\n§ 3.\n2)\n{number}"
+
+def test_running_header_is_dropped_and_edge_text_kept():
+    counters = {}
+    pages = list(iter_clean_pages([page(number) for number in range(1, 12)], counters))
+    assert pages[4] == "art. 5a. Przepis na górze strony\nTreść przepisu.\n§ 3.\n2)\n5"
+    assert counters["boilerplateChars"] == sum(len(f"Dziennik Ustaw – {number} – Poz. 877\n") for number in range(1, 12))
+
+def test_chunks_cover_the_text_without_headers():
+    text = PDF_PAGE_BREAK.join(page(number) for number in range(1, 12))
+    chunks, stats = chunk_text(text, target_tokens=50)
+    joined = "\n".join(chunks)
+    assert "Dziennik Ustaw" not in joined
+    assert joined.count("Treść przepisu.") == 11
+    assert stats["chunks"] == len(chunks)
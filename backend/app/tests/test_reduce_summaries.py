@@ -0,0 +1,51 @@
+import pytest
+
+import openai_analyzer
+from openai_analyzer import group_summaries, reduce_summaries
+from rate_limiter import estimate_tokens
+
+@pytest.fixture
+def merges(monkeypatch):
+    calls = []
+
+    def merge(text, prompt, max_tokens):
+        calls.append(text)
+        return f"merged({len(calls)})"
+
+    monkeypatch.setattr(openai_analyzer, "analyze_text_with_openai", merge)
+    return calls
+
+def test_groups_keep_order_within_fan_in_and_budget():
+    summaries = [f"summary {i} " + "x" * (i % 7) * 40 for i in range(100)]
+    groups = group_summaries(summaries, fan_in=10, max_input_tokens=200)
+    assert [summary for group in groups for summary in group] == summaries
+    for group in groups:
+        assert 1 <= len(group) <= 10
+        assert len(group) == 1 or sum(estimate_tokens(summary) + 1 for summary in group) <= 200
+
+def test_reduce_merges_level_by_level(merges):
+    summaries = [f"summary {i}" for i in range(250)]
+    reduced = reduce_summaries(summaries, fan_in=10, max_input_tokens=6000, max_workers=1)
+    # 250 -> 25 -> 3
+    assert len(merges) == 28
+    assert reduced == ["merged(26)", "merged(27)", "merged(28)"]
+    assert merges[0] == "\n".join(summaries[:10])
+
+def test_reduce_stops_when_merges_do_not_shrink(monkeypatch):
+    calls = []
+
+    def merge(text, prompt, max_tokens):
+        calls.append(text)
+        return "y" * 4000
+
+    monkeypatch.setattr(openai_analyzer, "analyze_text_with_openai", merge)
+    reduced = reduce_summaries(["short"] * 30, fan_in=10, max_input_tokens=500, max_workers=1)
+    # 30 -> 3 oversized summaries, which no call can merge any further.
+    assert len(calls) == 3
+    assert len(reduced) == 3
+
+def test_reduce_leaves_what_already_fits(merges):
+    assert reduce_summaries(["a", "b"], fan_in=10, max_input_tokens=6000, max_workers=1) == ["a", "b"]
+    assert reduce_summaries(["z" * 40000], fan_in=10, max_input_tokens=6000, max_workers=1) == ["z" * 40000]
+    assert reduce_summaries([], max_workers=1) == []
+    assert merges == []
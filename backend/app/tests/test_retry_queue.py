@@ -0,0 +1,62 @@
+import pytest
+
+import retry_queue
+from retry_queue import RetryQueue, PENDING, DEAD
+
+HOUR = 60 * 60
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(retry_queue, "time", clock)
+    monkeypatch.setattr(retry_queue, "RETRY_BASE_DELAY", HOUR)
+    monkeypatch.setattr(retry_queue, "RETRY_MAX_DELAY", 4 * HOUR)
+    monkeypatch.setattr(retry_queue, "RETRY_MAX_ATTEMPTS", 5)
+    return clock
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return RetryQueue(tmp_path / "retry_queue.sqlite3")
+
+def test_backoff_doubles_up_to_the_maximum(queue, clock):
+    queue.enqueue("DU/2024/1", delay=0)
+    assert queue.due(10) == ["DU/2024/1"]
+
+    for delay in (1, 2, 4, 4):
+        assert queue.fail("DU/2024/1", "No voting details") == PENDING
+        clock.now += delay * HOUR - 1
+        assert queue.due(10) == []
+        clock.now += 1
+        assert queue.due(10) == ["DU/2024/1"]
+
+def test_dead_after_max_attempts(queue, clock):
+    for _ in range(4):
+        assert queue.fail("DU/2024/1", "Processing failed") == PENDING
+    assert queue.fail("DU/2024/1", "Processing failed") == DEAD
+
+    clock.now += 365 * 24 * HOUR
+    assert queue.due(10) == []
+    assert "DU/2024/1" in queue
+    assert queue.counts() == {PENDING: 0, DEAD: 1}
+
+def test_enqueue_keeps_the_existing_item(queue, clock):
+    assert queue.enqueue("DU/2024/1")
+    queue.fail("DU/2024/1")
+    assert not queue.enqueue("DU/2024/1", delay=0)
+    assert queue.due(10) == []
+
+    queue.complete("DU/2024/1")
+    assert "DU/2024/1" not in queue
+
+def test_due_is_oldest_first_and_limited(queue, clock):
+    for i, delay in enumerate((30, 10, 20)):
+        queue.enqueue(f"DU/2024/{i}", delay=delay)
+    clock.now += 60
+    assert queue.due(2) == ["DU/2024/1", "DU/2024/2"]
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from run_memo import RunMemo, memoized, run_scope
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def call_concurrently(memo, key, function, callers):
+    results = [None] * callers
+    errors = [None] * callers
+
+    def _call(i):
+        try:
+            results[i] = memo.get_or_call(key, function)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=_call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def test_concurrent_callers_share_one_call():
+    memo = RunMemo()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"eli": "DU/2024/1"}
+
+    threads, results, errors = call_concurrently(memo, "key", fetch, 8)
+    # Every caller but the one running fetch is waiting on it.
+    wait_for(lambda: memo.stats()["hits"] == 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert errors == [None] * 8
+    assert all(result is results[0] for result in results)
+    assert memo.get_or_call("key", fetch) is results[0]
+    assert len(calls) == 1
+
+def test_none_is_not_kept():
+    memo = RunMemo()
+    answers = iter([None, "details"])
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return next(answers)
+
+    assert memo.get_or_call("key", fetch) is None
+    assert memo.get_or_call("key", fetch) == "details"
+    assert memo.get_or_call("key", fetch) == "details"
+    assert len(calls) == 2
+
+def test_waiting_callers_get_the_exception():
+    memo = RunMemo()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise ConnectionError("down")
+
+    threads, results, errors = call_concurrently(memo, "key", fetch, 4)
+    wait_for(lambda: memo.stats()["hits"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(error, ConnectionError) for error in errors)
+    assert results == [None] * 4
+    # The failure is not kept either.
+    assert memo.get_or_call("key", lambda: "details") == "details"
+
+def test_memoized_only_within_a_run_scope():
+    calls = []
+
+    @memoized
+    def lookup(eli):
+        calls.append(eli)
+        return {"eli": eli}
+
+    lookup("DU/2024/1")
+    lookup("DU/2024/1")
+    assert len(calls) == 2
+
+    with run_scope():
+        first = lookup("DU/2024/1")
+        assert lookup("DU/2024/1") is first
+    assert len(calls) == 3
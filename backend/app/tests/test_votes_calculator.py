@@ -0,0 +1,26 @@
+import random
+
+from votes_calculator import process_voting_batch, process_voting_data
+
+CLUBS = ["PiS", "KO", "Lewica", "Polska2050-TD", "PSL-TD", "Konfederacja", None, ""]
+VOTES = ["YES", "NO", "ABSTAIN", "ABSENT", "VOTE_VALID", None]
+
+def random_votings(count):
+    rng = random.Random(877)
+    votings = [{}, {"votes": []}]
+    for _ in range(count):
+        votes = [{"club": rng.choice(CLUBS), "vote": rng.choice(VOTES)} for _ in range(rng.choice([1, 7, 460]))]
+        votings.append({"votes": votes})
+    return votings
+
+def test_batch_matches_process_voting_data():
+    votings = random_votings(300)
+    for term in (9, 10, 8):
+        expected = [process_voting_data(voting, term) for voting in votings]
+        results = process_voting_batch(votings, term)
+        assert results == expected
+        # Same club order, as the frontend lists clubs in it.
+        assert [list(result["parties"]) for result in results] == [list(result["parties"]) for result in expected]
+
+def test_batch_of_nothing():
+    assert process_voting_batch([], 10) == []
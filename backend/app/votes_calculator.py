@@ -1,21 +1,21 @@
-import requests
+from votings_store import fetch_voting
+from run_memo import memoized
 from typing import Dict, Any, List, Tuple, Optional
 from collections import defaultdict
+from itertools import count
 
 GOVERNMENT_PARTIES = {
+    9: ["PiS"],
     10: ["KO", "Lewica", "Polska2050-TD", "PSL-TD"]
 }
 
-def get_sejm_voting_data(term: int = 10, sitting: int = 32, voting: int = 29) -> Dict[str, Any]:
-    url = f"https://api.sejm.gov.pl/sejm/term{term}/votings/{sitting}/{voting}"
-    
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Data download error: {e}")
-        return create_empty_result()
+# None when the voting could not be fetched, so the run memo does not keep
+# the failure and a later call in the same run tries again.
+@memoized
+def get_sejm_voting_data(term: int = 10, sitting: int = 32, voting: int = 29) -> Optional[Dict[str, Any]]:
+    data = fetch_voting(term, sitting, voting)
+    if data is None:
+        return None
     
     return process_voting_data(data, term)
 
@@ -83,6 +83,134 @@ def collect_votes_by_party(votes: List[Dict[str, Any]]) -> Dict[str, Dict[str, i
     
     return party_votes
 
+VOTE_TYPES = ["yes", "no", "abstain", "absent"]
+VOTE_CODES = {"YES": 0, "NO": 1, "ABSTAIN": 2}
+ABSENT_CODE = 3
+
+# Per-act contributions to the vote_stats_club / vote_stats_group tables,
+# keyed by category ("" when uncategorized) and promulgation month. Rows of
+# the same key are summed so each key is written once per batch.
+def aggregate_vote_stats(entries: List[Tuple[Dict[str, Any], Optional[str]]]) -> Tuple[List[tuple], List[tuple]]:
+    clubs: Dict[Tuple[str, str, str], List[int]] = defaultdict(lambda: [0, 0, 0, 0, 0, 0])
+    groups: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])
+
+    for filtered_item, category_name in entries:
+        votes = filtered_item.get("votes")
+        promulgation = filtered_item.get("promulgation")
+        if not votes or not promulgation or not votes.get("summary", {}).get("total"):
+            continue
+        category = category_name or ""
+        month = f"{str(promulgation)[:7]}-01"
+
+        for club, party in votes.get("parties", {}).items():
+            counts = clubs[(club, category, month)]
+            counts[0] += 1
+            for i, vote_type in enumerate(VOTE_TYPES, start=1):
+                counts[i] += party["votes"].get(vote_type, 0)
+            counts[5] += party.get("totalMembers", 0)
+
+        support = votes.get("votesSupportByGroup", {})
+        counts = groups[(category, month)]
+        counts[0] += 1
+        counts[1] += support.get("government", {}).get("yesVotes", 0)
+        counts[2] += support.get("opposition", {}).get("yesVotes", 0)
+        counts[3] += votes["summary"].get("yes", 0)
+        counts[4] += votes["summary"].get("total", 0)
+
+    club_rows = [key + tuple(counts) for key, counts in clubs.items()]
+    group_rows = [key + tuple(counts) for key, counts in groups.items()]
+    return club_rows, group_rows
+
+# Batch variant of process_voting_data for recomputing many votings at once
+# (e.g. a whole term). Each vote costs one dict lookup for the id of its
+# (club, vote) pair; the pair ids are decoded into (voting, club, vote type)
+# codes with NumPy and counted in one bincount; club, summary and government totals, yes votes by group and
+# every percentage are then computed on that count array, and result dicts
+# are only built at the end. Percentages are rounded with round() there, as
+# np.round rounds some halves differently, so results match
+# process_voting_data, club order included.
+def process_voting_batch(votings: List[Dict[str, Any]], term: int) -> List[Dict[str, Any]]:
+    import numpy as np
+
+    government_parties = GOVERNMENT_PARTIES.get(term, [])
+    pair_ids: Dict[Tuple[Any, Any], int] = defaultdict(count().__next__)
+    encoded: List[int] = []
+    votes_per_voting: List[int] = []
+    for voting in votings:
+        votes = voting.get("votes") or ()
+        encoded.extend([pair_ids[vote.get("club"), vote.get("vote")] for vote in votes])
+        votes_per_voting.append(len(votes))
+
+    # Club (-1 for votes without one) and vote type of every pair id.
+    club_ids: Dict[str, int] = {}
+    pair_club = np.empty(len(pair_ids), dtype=np.int64)
+    pair_type = np.empty(len(pair_ids), dtype=np.int64)
+    for (club, vote_type), pair_id in pair_ids.items():
+        pair_club[pair_id] = club_ids.setdefault(club, len(club_ids)) if club else -1
+        pair_type[pair_id] = VOTE_CODES.get(vote_type, ABSENT_CODE)
+
+    n_votings, n_clubs, n_types = len(votings), max(len(club_ids), 1), len(VOTE_TYPES)
+    pairs = np.asarray(encoded, dtype=np.int64)
+    pairs_club = pair_club[pairs]
+    with_club = pairs_club >= 0
+    voting_of_vote = np.repeat(np.arange(n_votings, dtype=np.int64), votes_per_voting)
+    voting_club = voting_of_vote[with_club] * n_clubs + pairs_club[with_club]
+    counts = np.bincount(
+        voting_club * n_types + pair_type[pairs[with_club]], minlength=n_votings * n_clubs * n_types
+    ).reshape(n_votings, n_clubs, n_types)
+
+    club_totals = counts.sum(axis=2)
+    summary = counts.sum(axis=1)
+    totals = summary.sum(axis=1)
+    is_government = np.isin(np.asarray(list(club_ids) or [""], dtype=object), government_parties)
+    government = counts[:, is_government, :].sum(axis=1)
+    government_totals = government.sum(axis=1)
+    yes = summary[:, 0]
+    support = np.stack([government[:, 0], yes - government[:, 0]], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        club_percentages = counts / club_totals[:, :, None] * 100
+        summary_percentages = summary / totals[:, None] * 100
+        government_percentages = government / government_totals[:, None] * 100
+        support_percentages = support / yes[:, None] * 100
+
+    # Clubs of a voting in the order of their first vote, as collect_votes_by_party sees them.
+    keys, first_vote = np.unique(voting_club, return_index=True)
+    keys = keys[np.argsort(first_vote)].tolist()
+
+    club_names = list(club_ids)
+    counts, club_totals, club_percentages = counts.tolist(), club_totals.tolist(), club_percentages.tolist()
+    results = []
+    for i in range(n_votings):
+        result = create_empty_result()
+        result["government"]["parties"] = government_parties
+        results.append(result)
+    for key in keys:
+        i, club = divmod(key, n_clubs)
+        results[i]["parties"][club_names[club]] = {
+            "totalMembers": club_totals[i][club],
+            "votes": dict(zip(VOTE_TYPES, counts[i][club])),
+            "percentages": {vote_type: round(value, 1) for vote_type, value in zip(VOTE_TYPES, club_percentages[i][club])},
+        }
+
+    rows = zip(
+        results, totals.tolist(), summary.tolist(), summary_percentages.tolist(), government_totals.tolist(),
+        government_percentages.tolist(), yes.tolist(), support.tolist(), support_percentages.tolist()
+    )
+    for result, total, votes, percentages, government_total, government_percentage, total_yes, yes_votes, yes_percentages in rows:
+        if total > 0:
+            result["summary"].update(total=total, **dict(zip(VOTE_TYPES, votes)))
+            result["summary"]["percentages"] = {vote_type: round(value, 1) for vote_type, value in zip(VOTE_TYPES, percentages)}
+        if government_total > 0:
+            result["government"]["votesPercentage"] = {
+                vote_type: round(value, 1) for vote_type, value in zip(VOTE_TYPES, government_percentage)
+            }
+        if total_yes > 0:
+            result["votesSupportByGroup"] = {
+                group: {"yesVotes": group_yes, "yesPercentage": round(percentage, 1)}
+                for group, group_yes, percentage in zip(("government", "opposition"), yes_votes, yes_percentages)
+            }
+    return results
+
 def calculate_party_percentages(result: Dict[str, Any], party: str, votes: Dict[str, int]) -> None:
     total = votes["total"]
     if total <= 0:
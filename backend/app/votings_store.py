@@ -0,0 +1,106 @@
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+import http_client
+from local_store import open_sqlite
+from config import SEJM_API_URL, SEJM_TERM, VOTINGS_STORE_FILE, VOTINGS_SYNC_WORKERS
+
+# Local copy of Sejm votings keyed by (term, sitting, number). A voting never
+# changes once it has taken place, so after the first download every lookup
+# is a local read. sync_sitting pulls all votings of a sitting in parallel.
+
+class VotingsStore:
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS votings (
+                term INTEGER NOT NULL,
+                sitting INTEGER NOT NULL,
+                number INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (term, sitting, number)
+            )
+        """)
+
+    def get(self, term: int, sitting: int, number: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM votings WHERE term = ? AND sitting = ? AND number = ?",
+                (term, sitting, number)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, term: int, sitting: int, number: int, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO votings (term, sitting, number, data, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (term, sitting, number, json.dumps(data, ensure_ascii=False), time.time())
+            )
+
+    def numbers(self, term: int, sitting: int) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT number FROM votings WHERE term = ? AND sitting = ? ORDER BY number",
+                (term, sitting)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+_store: Optional[VotingsStore] = None
+_store_lock = threading.Lock()
+
+def get_votings_store() -> VotingsStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = VotingsStore(VOTINGS_STORE_FILE)
+        return _store
+
+def _fetch_json(url: str) -> Optional[Any]:
+    try:
+        response = http_client.get(url)
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        print(f"Data download error: {e}")
+        return None
+
+def fetch_voting(term: int, sitting: int, number: int) -> Optional[Dict[str, Any]]:
+    store = get_votings_store()
+    data = store.get(term, sitting, number)
+    if data is not None:
+        return data
+
+    data = _fetch_json(f"{SEJM_API_URL}/term{term}/votings/{sitting}/{number}")
+    if isinstance(data, dict):
+        store.put(term, sitting, number, data)
+        return data
+    return None
+
+def sync_sitting(term: int, sitting: int, max_workers: int = VOTINGS_SYNC_WORKERS) -> int:
+    votings = _fetch_json(f"{SEJM_API_URL}/term{term}/votings/{sitting}")
+    if not isinstance(votings, list):
+        return 0
+
+    store = get_votings_store()
+    known = set(store.numbers(term, sitting))
+    missing = sorted({voting.get("votingNumber") for voting in votings if voting.get("votingNumber")} - known)
+    if not missing:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetched = list(executor.map(lambda number: fetch_voting(term, sitting, number), missing))
+    synced = sum(1 for data in fetched if data is not None)
+    print(f"🗳️ Synced {synced}/{len(missing)} votings of sitting {sitting} (term {term})")
+    return synced
+
+if __name__ == "__main__":
+    for sitting_arg in sys.argv[1:]:
+        sync_sitting(SEJM_TERM, int(sitting_arg))
@@ -0,0 +1,91 @@
+import sys
+import json
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+from common import FIXTURES_DIR, load_fixture, time_call, use_app
+
+# Micro benchmarks of the CPU-bound steps that run for every act: text
+# chunking, vote aggregation and category lookup. No network is involved.
+#
+#   python bench_micro.py
+#   python bench_micro.py --output new.json --baseline old.json
+
+def run_benchmarks(repeat: int) -> Dict[str, Dict[str, Any]]:
+    from chunking import chunk_text, iter_chunks
+    from config import PDF_PAGE_BREAK
+    from votes_calculator import collect_votes_by_party, process_voting_data, process_voting_batch
+    from category_index import CategoryIndex
+    from category_matcher import CategoryMatcher
+
+    results = {}
+
+    # About the size of a 30 page act.
+    page = (FIXTURES_DIR / "act_text.txt").read_text(encoding="utf-8")
+    pages = [f"Dziennik Ustaw – {number} – Poz. 877\n{page}" for number in range(1, 21)]
+    paged_text = PDF_PAGE_BREAK.join(pages)
+    results["chunking.chunk_text"] = time_call(lambda: chunk_text(paged_text), repeat)
+    results["chunking.chunk_text"]["chunks"] = chunk_text(paged_text)[1]["chunks"]
+    # The pipeline's path: pages from a generator, chunks as they are complete.
+    results["chunking.iter_chunks[pages]"] = time_call(lambda: list(iter_chunks(iter(pages))), repeat)
+
+    voting = load_fixture("voting.json")
+    results["votes.collect_votes_by_party"] = time_call(lambda: collect_votes_by_party(voting["votes"]), repeat, number=100)
+    results["votes.process_voting_data"] = time_call(lambda: process_voting_data(voting, 10), repeat, number=100)
+    # A hundred votings at once against the loop above.
+    results["votes.process_voting_batch[100]"] = time_call(lambda: process_voting_batch([voting] * 100, 10), repeat)
+
+    categories = load_fixture("categories.json")
+    act_details = list(load_fixture("act_details.json").values())
+    index = CategoryIndex(categories)
+    matcher = CategoryMatcher(index.categories())
+    results["categories.index_best_match"] = time_call(
+        lambda: [index.best_match(act["keywords"]) for act in act_details], repeat, number=100
+    )
+    results["categories.matcher_build"] = time_call(lambda: CategoryMatcher(index.categories()), repeat)
+    results["categories.matcher_rank"] = time_call(
+        lambda: [matcher.rank(act["keywords"], act["title"]) for act in act_details], repeat, number=10
+    )
+    return results
+
+def compare(results: Dict[str, Dict[str, Any]], baseline_path: Path, tolerance: float) -> bool:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    ok = True
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous["median_ms"]:
+            continue
+        change = result["median_ms"] / previous["median_ms"] - 1
+        status = "REGRESSION" if change > tolerance else "ok"
+        ok = ok and status == "ok"
+        print(f"{name:<36} {previous['median_ms']:>10.3f} -> {result['median_ms']:>10.3f} ms ({change:+.1%}) {status}")
+    return ok
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Micro benchmarks of chunking, vote aggregation and category lookup")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    output = args.output.resolve() if args.output else None
+    baseline = args.baseline.resolve() if args.baseline else None
+
+    with tempfile.TemporaryDirectory(prefix="bench-micro-") as tmp:
+        use_app("http://127.0.0.1:9", Path(tmp))
+        results = run_benchmarks(args.repeat)
+
+    for name, result in results.items():
+        print(f"{name:<36} best {result['best_ms']:>10.3f} ms  median {result['median_ms']:>10.3f} ms")
+
+    if output:
+        output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if baseline and not compare(results, baseline, args.tolerance):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List
+
+from common import BENCHMARKS_DIR, load_fixture, use_app
+from fixture_server import FixtureServer, YEAR
+
+# End-to-end benchmark: N acts go through main.process_single_act (the
+# sequential path), through batch_summaries (chunk summaries via the Batch
+# API, then the pipeline) or pipeline.run_pipeline at one or more worker settings,
+# against the fixture server and database.py on the SQLite stand-in (or on a
+# real Postgres with --database-url). Every configuration runs in a fresh process with an
+# empty work directory, so no cache carries over between them.
+#
+#   python bench_pipeline.py --acts 24 --workers 1,2,4 --sequential --batch
+#   python bench_pipeline.py --output new.json --baseline old.json
+
+RESULT_PREFIX = "BENCH_RESULT "
+REPORTED_SUMMARIES = (
+    "pipeline_stage_seconds",
+    "http_request_seconds",
+    "openai_request_seconds",
+    "pdf_extract_seconds",
+    "db_transaction_seconds",
+    "db_upsert_seconds",
+)
+
+def run_configuration(config: Dict[str, Any]) -> Dict[str, Any]:
+    work_dir = Path(config["work_dir"])
+    use_app(os.environ["BENCH_BASE_URL"], work_dir)
+
+    import main
+    import metrics
+    import pipeline
+    import openai_analyzer
+    import rate_limiter
+
+    openai_analyzer.LLM_CACHE_ENABLED = config["llm_cache"]
+    openai_analyzer.SUMMARY_CONCURRENCY = config["summary_workers"]
+    if not config["rate_limit"]:
+        rate_limiter._openai_limiter = rate_limiter.RateLimiter(10 ** 6, 10 ** 9)
+    for name in ("FETCH", "EXTRACT_MAP", "REDUCE", "CATEGORIZE"):
+        setattr(pipeline, f"PIPELINE_{name}_WORKERS", config["workers"])
+
+    standin = None
+    if config["database_url"]:
+        os.environ["DATABASE_URL"] = config["database_url"]
+    else:
+        from sqlite_standin import SqliteStandIn
+        standin = SqliteStandIn(work_dir / "standin.sqlite3", load_fixture("categories.json"))
+        standin.install()
+
+    acts = list(reversed(main.fetch_and_filter_acts(YEAR)[:config["acts"]]))
+
+    started = time.perf_counter()
+    if config["mode"] == "sequential":
+        results = [(act, main.process_single_act(act)) for act in acts]
+    elif config["mode"] == "batch":
+        import batch_summaries
+        from processed_acts import get_processed_acts
+        batch_summaries.submit_acts(acts, YEAR)
+        batch_summaries.collect(wait=True, poll_interval=0.1)
+        processed = get_processed_acts().elis(YEAR)
+        results = [(act, act["ELI"] in processed) for act in acts]
+    else:
+        results = pipeline.run_pipeline(acts)
+    elapsed = time.perf_counter() - started
+
+    latencies = {}
+    for (name, labels), (count, total, maximum) in sorted(metrics.get_metrics().summaries.items()):
+        if name in REPORTED_SUMMARIES:
+            key = name + "".join(f"[{value}]" for _, value in labels)
+            latencies[key] = {"count": count, "mean_ms": round(total / count * 1000, 2), "max_ms": round(maximum * 1000, 2)}
+
+    saved = sum(1 for _, success in results if success)
+    return {
+        "name": config["name"],
+        "acts": len(acts),
+        "saved": saved,
+        "seconds": round(elapsed, 3),
+        "acts_per_second": round(saved / elapsed, 3) if elapsed else 0,
+        "db_rows": standin.count() if standin else None,
+        "latencies": latencies,
+    }
+
+def spawn(config: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+    env = dict(os.environ, BENCH_BASE_URL=base_url)
+    completed = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--run", json.dumps(config)],
+        cwd=BENCHMARKS_DIR, env=env, capture_output=True, text=True
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Configuration {config['name']} failed:\n{completed.stderr[-2000:]}")
+
+def compare(results: List[Dict[str, Any]], baseline_path: Path, tolerance: float) -> bool:
+    baseline = {result["name"]: result for result in json.loads(baseline_path.read_text(encoding="utf-8"))}
+    ok = True
+    for result in results:
+        previous = baseline.get(result["name"])
+        if not previous or not previous["acts_per_second"]:
+            continue
+        change = result["acts_per_second"] / previous["acts_per_second"] - 1
+        status = "REGRESSION" if change < -tolerance else "ok"
+        ok = ok and status == "ok"
+        print(f"{result['name']:<24} {previous['acts_per_second']:>8.3f} -> {result['acts_per_second']:>8.3f} acts/s ({change:+.1%}) {status}")
+    return ok
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="End-to-end act processing benchmark")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--acts", type=int, default=12)
+    parser.add_argument("--workers", default="1,2,4", help="comma separated pipeline worker counts per stage")
+    parser.add_argument("--summary-workers", type=int, default=4)
+    parser.add_argument("--sequential", action="store_true", help="also run main.process_single_act one act at a time")
+    parser.add_argument("--batch", action="store_true", help="also summarize through the Batch API stub (batch_summaries.py)")
+    parser.add_argument("--http-latency", type=float, default=0.02, help="seconds per ELI/Sejm request")
+    parser.add_argument("--openai-latency", type=float, default=0.2, help="seconds per OpenAI request")
+    parser.add_argument("--database-url", default="", help="Postgres to use instead of the SQLite stand-in")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM cache on (it is per configuration)")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the OpenAI rate limits from config.py")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop against the baseline")
+    args = parser.parse_args()
+
+    if args.run:
+        print(RESULT_PREFIX + json.dumps(run_configuration(json.loads(args.run))))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        tmp_dir = Path(tmp)
+        common = {
+            "acts": args.acts,
+            "summary_workers": args.summary_workers,
+            "database_url": args.database_url,
+            "llm_cache": args.llm_cache,
+            "rate_limit": args.rate_limit,
+        }
+        configs = []
+        if args.sequential:
+            configs.append(dict(common, name="sequential", mode="sequential", workers=1))
+        if args.batch:
+            configs.append(dict(common, name="batch", mode="batch", workers=max(int(value) for value in args.workers.split(",") if value)))
+        for workers in [int(value) for value in args.workers.split(",") if value]:
+            configs.append(dict(common, name=f"pipeline-w{workers}", mode="pipeline", workers=workers))
+
+        results = []
+        with FixtureServer(args.acts, tmp_dir / "pdfs", args.http_latency, args.openai_latency) as server:
+            for config in configs:
+                config["work_dir"] = str(tmp_dir / config["name"])
+                result = spawn(config, server.base_url)
+                results.append(result)
+                rows = f", {result['db_rows']} rows in acts" if result.get("db_rows") is not None else ""
+                print(f"{result['name']:<24} {result['saved']}/{result['acts']} acts in {result['seconds']:.2f}s ({result['acts_per_second']:.3f} acts/s{rows})")
+                for key, latency in result["latencies"].items():
+                    print(f"    {key:<44} n={latency['count']:<5} mean {latency['mean_ms']:>9.2f} ms  max {latency['max_ms']:>9.2f} ms")
+            print(f"Fixture server requests: {dict(server.requests)}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from common import BENCHMARKS_DIR, use_app
+
+# Startup cost: import time of the entry modules and the wall time of a run
+# that finds nothing new (every act of the list already processed), which is
+# what most runs of a frequent poll look like. Every sample is a fresh
+# interpreter, so nothing is imported yet.
+#
+#   python bench_startup.py
+#   python bench_startup.py --importtime main
+#   python bench_startup.py --output new.json --baseline old.json
+
+RESULT_PREFIX = "BENCH_RESULT "
+ENTRY_MODULES = ("main", "daemon", "pipeline", "openai_analyzer", "pdf_utils")
+# Dependencies that only processing an act needs.
+HEAVY_MODULES = ("openai", "tenacity", "fitz", "numpy")
+
+def loaded_heavy_modules() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+def run_sample(kind: str, target: str) -> Dict[str, Any]:
+    use_app(os.environ["BENCH_BASE_URL"], Path(os.environ["BENCH_WORK_DIR"]))
+    started = time.perf_counter()
+    if kind == "import":
+        __import__(target)
+        return {"ms": (time.perf_counter() - started) * 1000, "heavy": loaded_heavy_modules()}
+
+    import main
+    if target == "seed":
+        year = datetime.now().year
+        from processed_acts import get_processed_acts
+        get_processed_acts().mark(year, [act["ELI"] for act in main.fetch_and_filter_acts(year)])
+    else:
+        main.run()
+    return {"ms": (time.perf_counter() - started) * 1000, "heavy": loaded_heavy_modules()}
+
+def spawn(kind: str, target: str, env: Dict[str, str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--run", kind, target],
+        cwd=BENCHMARKS_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return dict(json.loads(line[len(RESULT_PREFIX):]), wall_ms=wall_ms)
+    raise RuntimeError(f"{kind} {target} failed:\n{completed.stderr[-2000:]}")
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    in_process = sorted(sample["ms"] for sample in samples)
+    wall = sorted(sample["wall_ms"] for sample in samples)
+    return {
+        "best_ms": round(in_process[0], 3),
+        "median_ms": round(in_process[len(in_process) // 2], 3),
+        "process_median_ms": round(wall[len(wall) // 2], 3),
+        "heavy_modules": samples[-1]["heavy"],
+    }
+
+def print_importtime(module: str, env: Dict[str, str], top: int = 20) -> None:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=env["BENCH_WORK_DIR"], env=dict(env, PYTHONPATH=str(BENCHMARKS_DIR.parent / "app")),
+        capture_output=True, text=True
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>9.1f} ms {name}")
+
+def compare(results: Dict[str, Dict[str, Any]], baseline_path: Path, tolerance: float) -> bool:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    ok = True
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous["median_ms"]:
+            continue
+        change = result["median_ms"] / previous["median_ms"] - 1
+        status = "REGRESSION" if change > tolerance else "ok"
+        ok = ok and status == "ok"
+        print(f"{name:<28} {previous['median_ms']:>10.3f} -> {result['median_ms']:>10.3f} ms ({change:+.1%}) {status}")
+    return ok
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import time and no-op run time in fresh interpreters")
+    parser.add_argument("--run", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--acts", type=int, default=30, help="acts in the list, all of them already processed")
+    parser.add_argument("--http-latency", type=float, default=0.02, help="seconds per ELI/Sejm request")
+    parser.add_argument("--importtime", metavar="MODULE", help="print the slowest imports of MODULE (python -X importtime) and exit")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    if args.run:
+        print(RESULT_PREFIX + json.dumps(run_sample(*args.run)))
+        return 0
+
+    # Not imported by the samples themselves: the sample PDFs need PyMuPDF.
+    from fixture_server import FixtureServer
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        tmp_dir = Path(tmp)
+        with FixtureServer(args.acts, tmp_dir / "pdfs", args.http_latency, 0) as server:
+            env = dict(
+                os.environ,
+                BENCH_BASE_URL=server.base_url,
+                BENCH_WORK_DIR=str(tmp_dir / "work"),
+                # Checked by check_environment, never connected to on a run without new acts.
+                DATABASE_URL="postgresql://bench@127.0.0.1:9/bench",
+                LOG_FILE="",
+            )
+            (tmp_dir / "work").mkdir()
+
+            if args.importtime:
+                print_importtime(args.importtime, env)
+                return 0
+
+            for module in ENTRY_MODULES:
+                results[f"import.{module}"] = summarize([spawn("import", module, env) for _ in range(args.repeat)])
+
+            spawn("run", "seed", env)
+            # The first run fills the HTTP cache, later ones revalidate the act list.
+            spawn("run", "noop", env)
+            results["run.nothing_new"] = summarize([spawn("run", "noop", env) for _ in range(args.repeat)])
+
+    for name, result in results.items():
+        heavy = ", ".join(result["heavy_modules"]) or "-"
+        print(f"{name:<28} median {result['median_ms']:>9.1f} ms  process {result['process_median_ms']:>9.1f} ms  heavy: {heavy}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
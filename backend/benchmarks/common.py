@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = BENCHMARKS_DIR / "fixtures"
+APP_DIR = BENCHMARKS_DIR.parent / "app"
+
+def load_fixture(name: str) -> Any:
+    with open(FIXTURES_DIR / name, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# The app reads its configuration from the environment at import time and
+# keeps its local state (caches, checkpoints, app.log) in the working
+# directory, so both have to be set before the first app import.
+def use_app(base_url: str, work_dir: Path) -> None:
+    os.environ.update({
+        "BASIC_URL": f"{base_url}/eli/acts/",
+        "DU_URL": f"{base_url}/eli/acts/DU",
+        "VOTING_URL": f"{base_url}/sejm/term10/votings/",
+        "SEJM_API_URL": f"{base_url}/sejm",
+        "SEJM_TERM": "10",
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+    })
+    work_dir.mkdir(parents=True, exist_ok=True)
+    os.chdir(work_dir)
+    if str(APP_DIR) not in sys.path:
+        sys.path.insert(0, str(APP_DIR))
+
+def time_call(function: Callable[[], Any], repeat: int = 5, number: int = 1) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - started) / number)
+    timings.sort()
+    return {
+        "best_ms": round(timings[0] * 1000, 3),
+        "median_ms": round(timings[len(timings) // 2] * 1000, 3),
+    }
@@ -0,0 +1,298 @@
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import Counter
+from copy import deepcopy
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import load_fixture
+from sample_pdfs import load_sample_pdfs, SAMPLES
+
+# One local HTTP server standing in for every external service of a run:
+# the ELI API (act list, act details, PDFs), the Sejm API (processes and
+# votings) and the OpenAI chat completions endpoint. Responses are replayed
+# from fixtures/; the recorded acts are cloned under new positions when a
+# benchmark asks for more acts than were recorded. Latencies are simulated
+# with a fixed delay per request. OpenAI batches (files and batches
+# endpoints) are answered with the same canned completions; a batch reports
+# "in_progress" on its first poll and is completed on the next one.
+
+RECORDED_API = "https://api.sejm.gov.pl"
+YEAR = 2025
+FIRST_POSITION = 901
+
+ACT_LIST_RE = re.compile(r"^/eli/acts/DU/(\d{4})/?$")
+ACT_RE = re.compile(r"^/eli/acts/DU/(\d{4})/(\d+)/?$")
+PDF_RE = re.compile(r"^/eli/acts/DU/(\d{4})/(\d+)/text\.pdf$")
+PROCESS_RE = re.compile(r"^/sejm/term(\d+)/processes/(\w+)$")
+VOTING_RE = re.compile(r"^/sejm/term(\d+)/votings/(\d+)/(\d+)$")
+SITTING_RE = re.compile(r"^/sejm/term(\d+)/votings/(\d+)$")
+CATEGORY_RE = re.compile(r'"category": "([^"]+)"')
+FILE_CONTENT_RE = re.compile(r"^/v1/files/([\w-]+)/content$")
+BATCH_RE = re.compile(r"^/v1/batches/([\w-]+)$")
+
+class Fixtures:
+    def __init__(self, acts: int, pdf_cache_dir: Path, base_url: str = ""):
+        self.base_url = base_url
+        recorded_items = list(reversed(load_fixture("acts.json")["items"]))
+        recorded_details = load_fixture("act_details.json")
+        self.process = load_fixture("process.json")
+        self.voting = load_fixture("voting.json")
+        self.pdfs = load_sample_pdfs(pdf_cache_dir)
+
+        # Clones keep the recorded metadata, only the position (and so the ELI) changes.
+        self.items: List[Dict[str, Any]] = []
+        self.details: Dict[int, Dict[str, Any]] = {}
+        for i in range(acts):
+            recorded = recorded_items[i % len(recorded_items)]
+            position = FIRST_POSITION + i
+            item = dict(recorded, pos=position, ELI=f"DU/{YEAR}/{position}", displayAddress=f"Dz.U. {YEAR} poz. {position}")
+            details = deepcopy(recorded_details[recorded["ELI"]])
+            details.update(item)
+            self.items.append(item)
+            self.details[position] = details
+        self.items.reverse()
+
+    def act_list(self) -> Dict[str, Any]:
+        return {"count": len(self.items), "items": self.items, "offset": 0, "totalCount": len(self.items)}
+
+    def act(self, position: int) -> Optional[Dict[str, Any]]:
+        details = self.details.get(position)
+        if details is None:
+            return None
+        # Recorded links point at the real Sejm API.
+        return json.loads(json.dumps(details, ensure_ascii=False).replace(RECORDED_API, self.base_url))
+
+    def pdf(self, position: int) -> Optional[bytes]:
+        if position not in self.details:
+            return None
+        names = list(SAMPLES)
+        return self.pdfs[names[position % len(names)]]
+
+    def sitting(self, sitting: int) -> List[Dict[str, Any]]:
+        return [{"sitting": sitting, "votingNumber": number} for number in range(1, 41)]
+
+    def voting_data(self, sitting: int, number: int) -> Dict[str, Any]:
+        return dict(self.voting, sitting=sitting, votingNumber=number)
+
+def chat_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    messages = body.get("messages", [])
+    system = next((message["content"] for message in messages if message["role"] == "system"), "")
+    user = next((message["content"] for message in messages if message["role"] == "user"), "")
+
+    if "ISTNIEJĄCE KATEGORIE" in system:
+        match = CATEGORY_RE.search(system)
+        content = json.dumps({
+            "action": "match",
+            "category_name": match.group(1) if match else "Inne",
+            "new_keywords": [],
+            "reasoning": "Odpowiedź serwera testowego."
+        }, ensure_ascii=False)
+    elif "json" in system.lower():
+        content = json.dumps({
+            "title": "Zmiany w przepisach podatkowych",
+            "content_html": "<p>Ustawa zmienia zasady rozliczania podatku dochodowego.</p>"
+                            "<ul><li>Nowe zwolnienie dla świadczeń mieszkaniowych.</li></ul>"
+        }, ensure_ascii=False)
+    else:
+        content = f"Fragment ({len(user)} znaków) zmienia przepisy dotyczące podatku dochodowego. Wprowadza nowe zwolnienie i przepisy przejściowe."
+
+    prompt_tokens = (len(system) + len(user)) // 4 + 1
+    completion_tokens = len(content) // 4 + 1
+    return {
+        "id": "chatcmpl-benchmark",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "benchmark"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+class BatchStub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+
+    def _new_id(self, prefix: str) -> str:
+        return f"{prefix}-{len(self.files) + len(self.batches) + 1}"
+
+    def upload(self, content_type: str, body: bytes) -> Dict[str, Any]:
+        message = BytesParser(policy=default_policy).parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        data, purpose = b"", "batch"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                data = part.get_payload(decode=True)
+            elif name == "purpose":
+                purpose = part.get_content().strip()
+        return self._add_file(data, purpose)
+
+    def _add_file(self, data: bytes, purpose: str) -> Dict[str, Any]:
+        with self._lock:
+            file_id = self._new_id("file")
+            self.files[file_id] = data
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()), "filename": f"{file_id}.jsonl", "purpose": purpose, "status": "processed"}
+
+    def create(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            batch_id = self._new_id("batch")
+            batch = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": body.get("endpoint"),
+                "input_file_id": body.get("input_file_id"),
+                "completion_window": body.get("completion_window"),
+                "status": "validating",
+                "output_file_id": None,
+                "error_file_id": None,
+                "created_at": int(time.time()),
+                "metadata": body.get("metadata"),
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+            self.batches[batch_id] = batch
+        return batch
+
+    def retrieve(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        if batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        elif batch["status"] == "in_progress":
+            self._complete(batch)
+        return batch
+
+    def _complete(self, batch: Dict[str, Any]) -> None:
+        lines = []
+        requests = [json.loads(line) for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines() if line.strip()]
+        for i, request in enumerate(requests):
+            lines.append(json.dumps({
+                "id": f"batch_req-{i}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "request_id": f"req-{i}", "body": chat_completion(request["body"])},
+                "error": None,
+            }, ensure_ascii=False))
+        output = self._add_file(("\n".join(lines) + "\n").encode("utf-8"), "batch_output")
+        batch.update(
+            status="completed",
+            output_file_id=output["id"],
+            completed_at=int(time.time()),
+            request_counts={"total": len(requests), "completed": len(requests), "failed": 0},
+        )
+
+class FixtureServer:
+    def __init__(self, acts: int, pdf_cache_dir: Path, http_latency: float = 0.02, openai_latency: float = 0.2):
+        self.http_latency = http_latency
+        self.openai_latency = openai_latency
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self.fixtures = Fixtures(acts, pdf_cache_dir, self.base_url)
+        self.batches = BatchStub()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _count(self, route: str) -> None:
+        with self._lock:
+            self.requests[route] += 1
+
+    def route(self, path: str) -> Tuple[str, int, Optional[Any]]:
+        fixtures = self.fixtures
+        if match := PDF_RE.match(path):
+            return "pdf", 200, fixtures.pdf(int(match.group(2)))
+        if match := ACT_RE.match(path):
+            return "act", 200, fixtures.act(int(match.group(2)))
+        if ACT_LIST_RE.match(path):
+            return "act_list", 200, fixtures.act_list()
+        if PROCESS_RE.match(path):
+            return "process", 200, fixtures.process
+        if match := VOTING_RE.match(path):
+            return "voting", 200, fixtures.voting_data(int(match.group(2)), int(match.group(3)))
+        if match := SITTING_RE.match(path):
+            return "sitting", 200, fixtures.sitting(int(match.group(2)))
+        if match := FILE_CONTENT_RE.match(path):
+            return "openai_file", 200, self.batches.files.get(match.group(1))
+        if match := BATCH_RE.match(path):
+            return "openai_batch", 200, self.batches.retrieve(match.group(1))
+        return "unknown", 404, None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str, etag: Optional[str] = None) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = re.sub(r"/+", "/", self.path.split("?")[0])
+                route, status, payload = server.route(path)
+                server._count(route)
+                time.sleep(server.http_latency)
+
+                if payload is None:
+                    self._send(404, b'{"error": "not found"}', "application/json")
+                elif isinstance(payload, bytes):
+                    self._send(status, payload, "application/octet-stream" if route == "openai_file" else "application/pdf")
+                else:
+                    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self._send(304, b"", "application/json", etag)
+                    else:
+                        self._send(status, body, "application/json", etag)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length)
+                path = self.path.rstrip("/")
+                if path.endswith("/chat/completions"):
+                    server._count("openai")
+                    time.sleep(server.openai_latency)
+                    self._send(200, json.dumps(chat_completion(json.loads(raw or b"{}")), ensure_ascii=False).encode("utf-8"), "application/json")
+                elif path.endswith("/v1/files"):
+                    server._count("openai_file_upload")
+                    uploaded = server.batches.upload(self.headers.get("Content-Type", ""), raw)
+                    self._send(200, json.dumps(uploaded).encode("utf-8"), "application/json")
+                elif path.endswith("/v1/batches"):
+                    server._count("openai_batch_create")
+                    batch = server.batches.create(json.loads(raw or b"{}"))
+                    self._send(200, json.dumps(batch).encode("utf-8"), "application/json")
+                else:
+                    server._count("unknown")
+                    self._send(404, b'{"error": "not found"}', "application/json")
+
+        return Handler
@@ -0,0 +1,52 @@
+import os
+from pathlib import Path
+from typing import Dict
+
+import fitz
+
+from common import FIXTURES_DIR
+
+# Sample PDFs served by the fixture server, built from fixtures/act_text.txt
+# and laid out like Dziennik Ustaw pages (a running header with the page
+# number and a footer on every page). They are generated on first use and
+# kept in the benchmark work directory instead of being committed, since the
+# embedded font alone is several hundred kilobytes.
+
+SAMPLES = {"short": 2, "medium": 8, "long": 30}
+
+# Any TTF with Polish characters; the built-in PDF fonts turn them into "?".
+FONT_FILE = os.getenv("BENCH_PDF_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+
+def build_pdf(text: str, pages: int) -> bytes:
+    paragraphs = [paragraph for paragraph in text.split("\n") if paragraph.strip()]
+    font_file = FONT_FILE if Path(FONT_FILE).exists() else None
+    fontname = "act" if font_file else "helv"
+
+    doc = fitz.open()
+    position = 0
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        if font_file:
+            page.insert_font(fontname=fontname, fontfile=font_file)
+        page.insert_text((72, 40), f"Dziennik Ustaw – {number} – Poz. 877", fontname=fontname, fontsize=8)
+        body = []
+        # Roughly a page worth of paragraphs, continuing where the last page stopped.
+        while sum(len(paragraph) for paragraph in body) < 2000:
+            body.append(paragraphs[position % len(paragraphs)])
+            position += 1
+        page.insert_textbox(fitz.Rect(72, 60, 523, 800), "\n".join(body), fontname=fontname, fontsize=9)
+        page.insert_text((72, 820), "Opracowano na podstawie: Dz. U. z 2025 r. poz. 877", fontname=fontname, fontsize=7)
+    data = doc.tobytes(garbage=4, deflate=True)
+    doc.close()
+    return data
+
+def load_sample_pdfs(cache_dir: Path) -> Dict[str, bytes]:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    text = (FIXTURES_DIR / "act_text.txt").read_text(encoding="utf-8")
+    pdfs = {}
+    for name, pages in SAMPLES.items():
+        path = cache_dir / f"{name}.pdf"
+        if not path.exists():
+            path.write_bytes(build_pdf(text, pages))
+        pdfs[name] = path.read_bytes()
+    return pdfs
@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# SQLite stand-in for Postgres, used when no database URL is given. The real
+# database.py runs against it: install() swaps the psycopg2 pool class and
+# execute_values in the database module for the ones below, which hand out
+# SQLite connections with the psycopg2 surface database.py uses. So
+# categorization (index, similarity and the AI fallback against the stub),
+# the batched upsert with its savepoints, the category writes and the
+# vote_stats aggregates are the code of a real run.
+#
+# The few Postgres-only bits of SQL are translated on the way: %s
+# placeholders, the VALUES %s of execute_values, FOR UPDATE (SQLite locks the
+# whole database for a write transaction anyway) and the upsert's
+# (xmax = 0) "was inserted" column, which is answered by looking the keys up
+# before the statement. Tables follow frontend/prisma/schema.prisma.
+#
+# Needs the app directory on sys.path (see common.use_app).
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS acts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        eli TEXT UNIQUE,
+        title TEXT NOT NULL,
+        act_number TEXT,
+        simple_title TEXT,
+        content TEXT,
+        refs TEXT,
+        texts TEXT,
+        item_type TEXT,
+        announcement_date TEXT,
+        change_date TEXT,
+        promulgation TEXT,
+        item_status TEXT,
+        comments TEXT,
+        keywords TEXT,
+        file TEXT,
+        votes TEXT,
+        category TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS category (
+        category TEXT PRIMARY KEY,
+        keywords TEXT NOT NULL DEFAULT '[]'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS vote_stats_club (
+        club TEXT NOT NULL,
+        category TEXT NOT NULL,
+        month TEXT NOT NULL,
+        acts INTEGER NOT NULL DEFAULT 0,
+        yes INTEGER NOT NULL DEFAULT 0,
+        no INTEGER NOT NULL DEFAULT 0,
+        abstain INTEGER NOT NULL DEFAULT 0,
+        absent INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (club, category, month)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS vote_stats_group (
+        category TEXT NOT NULL,
+        month TEXT NOT NULL,
+        acts INTEGER NOT NULL DEFAULT 0,
+        government_yes INTEGER NOT NULL DEFAULT 0,
+        opposition_yes INTEGER NOT NULL DEFAULT 0,
+        total_yes INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (category, month)
+    )
+    """,
+]
+
+INSERT_RE = re.compile(r"INSERT INTO (\w+) \((\w+)")
+INSERTED_COLUMN = "(xmax = 0)"
+
+def _translate(query: str) -> str:
+    return query.replace("%s", "?").replace(" FOR UPDATE", "")
+
+def _adapt(value: Any) -> Any:
+    # text[] columns (keywords) arrive as Python lists.
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+class StandInCursor:
+    def __init__(self, connection: "StandInConnection"):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self.closed = False
+
+    def execute(self, query: str, params: Optional[Sequence[Any]] = None) -> None:
+        # Like psycopg2, the first statement opens a transaction.
+        if not self._connection.raw.in_transaction:
+            self._cursor.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(_translate(query), [_adapt(value) for value in params or ()])
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._cursor.fetchone()
+
+    def fetchall(self) -> List[tuple]:
+        return self._cursor.fetchall()
+
+    def close(self) -> None:
+        self._cursor.close()
+        self.closed = True
+
+class StandInConnection:
+    def __init__(self, path: str):
+        self.raw = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.closed = 0
+
+    def cursor(self) -> StandInCursor:
+        return StandInCursor(self)
+
+    def commit(self) -> None:
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def close(self) -> None:
+        self.raw.close()
+        self.closed = 1
+
+# Same constructor and methods as psycopg2's ThreadedConnectionPool; the DSN
+# is the path of the SQLite file.
+class StandInPool:
+    def __init__(self, minconn: int, maxconn: int, dsn: str):
+        self._path = dsn
+        self._idle: List[StandInConnection] = []
+
+    def getconn(self) -> StandInConnection:
+        try:
+            return self._idle.pop()
+        except IndexError:
+            return StandInConnection(self._path)
+
+    def putconn(self, conn: StandInConnection, close: bool = False) -> None:
+        if close:
+            conn.close()
+        else:
+            self._idle.append(conn)
+
+    def closeall(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+def execute_values(cursor: StandInCursor, query: str, rows: Sequence[Sequence[Any]], template: Optional[str] = None, page_size: int = 100, fetch: bool = False) -> Optional[List[tuple]]:
+    rows = [tuple(row) for row in rows]
+    results: List[tuple] = []
+    for start in range(0, len(rows), page_size or 100):
+        page = rows[start:start + (page_size or 100)]
+        values = ", ".join("(" + ", ".join(["%s"] * len(row)) + ")" for row in page)
+        statement = query.replace("VALUES %s", f"VALUES {values}", 1)
+
+        existing = None
+        if INSERTED_COLUMN in statement:
+            # The conflict key is the first column of the insert (eli for acts).
+            table, column = INSERT_RE.search(statement).groups()
+            keys = [row[0] for row in page if row[0] is not None]
+            existing = set()
+            if keys:
+                cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(keys))})", keys)
+                existing = {key for key, in cursor.fetchall()}
+            statement = statement.replace(INSERTED_COLUMN, "1")
+
+        cursor.execute(statement, [value for row in page for value in row])
+        if fetch:
+            returned = cursor.fetchall()
+            if existing is not None:
+                returned = [(key, key not in existing) for key, _ in returned]
+            results.extend(returned)
+    return results if fetch else None
+
+class SqliteStandIn:
+    def __init__(self, path: Path, categories: List[Dict[str, Any]]):
+        self.path = path
+        conn = sqlite3.connect(str(path), isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.executemany(
+                "INSERT OR IGNORE INTO category (category, keywords) VALUES (?, ?)",
+                [(category["category"], json.dumps(category["keywords"], ensure_ascii=False)) for category in categories]
+            )
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        conn = sqlite3.connect(str(self.path))
+        try:
+            return conn.execute("SELECT COUNT(*) FROM acts").fetchone()[0]
+        finally:
+            conn.close()
+
+    def install(self) -> None:
+        import database
+        database.close_connection_pool()
+        database.ThreadedConnectionPool = StandInPool
+        database.execute_values = execute_values
+        os.environ["DATABASE_URL"] = str(self.path)
@@ -1,5 +1,6 @@
 export interface Act {
   id: string | number;
+  eli?: string | null;
   title: string;
   act_number?: string;
   simple_title?: string;